@@ -1,5 +1,4 @@
 import React, { useState } from "react";
-import axios from "axios";
 import Dashboard from "./pages/Dashboard";
 import Insights from "./pages/Insights";
 import Trends from "./pages/Trends";
@@ -7,11 +6,14 @@ import Trends from "./pages/Trends";
 export default function App() {
   const [file, setFile] = useState(null);
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [response, setResponse] = useState(null);
   const [activeTab, setActiveTab] = useState("Dashboard");
   const [renderKey, setRenderKey] = useState(0);
 
-  // ✅ Upload CSV directly to backend — no local parsing
+  // ✅ Upload CSV directly to backend — no local parsing.
+  // The streaming endpoint sends NDJSON events (dataset → eda → plan → insight… → result),
+  // so the dashboard renders as soon as the plan arrives and insights fill in afterwards.
   const handleUpload = async () => {
     if (!file) {
       alert("Please select a CSV file first!");
@@ -19,48 +21,111 @@ export default function App() {
     }
 
     setLoading(true);
+    setStreaming(true);
     const formData = new FormData();
     formData.append("file", file);
 
-    try {
-      const res = await axios.post("http://localhost:8000/upload", formData, {
-        headers: { "Content-Type": "multipart/form-data" },
-      });
+    const applyPlan = (plan) => {
+      setResponse((prev) => ({
+        ...prev,
+        industry: plan.industry || "Unknown",
+        kpis: plan.kpis || [],
+        charts: plan.charts || [],
+        insights: plan.insights || {},
+        eda: plan.eda || prev?.eda || {},
+        datasetId: plan.dataset_id || prev?.datasetId || null,
+        detailedInsights:
+          plan.detailed_insights ||
+          (plan.insights_flat || []).slice(0, 5).map(() => null),
+      }));
+    };
 
-      console.log("✅ Backend response:", res.data);
+    const handleEvent = (evt) => {
+      switch (evt.event) {
+        case "dataset":
+          setResponse({ datasetId: evt.dataset_id, eda: {} });
+          break;
+        case "eda":
+          setResponse((prev) => ({ ...prev, eda: evt.eda || {} }));
+          break;
+        case "plan":
+          console.log("✅ Dashboard plan:", evt);
+          applyPlan(evt);
+          // Force dashboard re-render
+          setRenderKey(Date.now());
+          setLoading(false);
+          break;
+        case "insight":
+          setResponse((prev) => {
+            const detailed = [...(prev?.detailedInsights || [])];
+            detailed[evt.index] = evt.text;
+            return { ...prev, detailedInsights: detailed };
+          });
+          break;
+        case "result":
+          console.log("✅ Backend response:", evt);
+          applyPlan(evt);
+          break;
+        case "error":
+          throw new Error(evt.error);
+        default:
+          break;
+      }
+    };
 
-      // Store backend response (KPIs, charts, insights, etc.)
-      setResponse({
-        industry: res.data.industry || "Unknown",
-        kpis: res.data.kpis || [],
-        charts: res.data.charts || [],
-        insights: res.data.insights || {},
-        eda: res.data.eda || {},
+    try {
+      const res = await fetch("http://localhost:8000/upload/stream", {
+        method: "POST",
+        body: formData,
       });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
 
-      // Force dashboard re-render
-      setRenderKey(Date.now());
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop();
+        lines.filter((l) => l.trim()).forEach((l) => handleEvent(JSON.parse(l)));
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer));
     } catch (error) {
       console.error("❌ Upload failed:", error);
       alert("Upload failed: " + error.message);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
   // ✅ Tab renderer
   const renderTab = () => {
     if (loading) return <p>Processing file... please wait ⏳</p>;
-    if (!response) return <p>Upload a CSV to generate your AI dashboard.</p>;
+    if (!response || !response.kpis) return <p>Upload a CSV to generate your AI dashboard.</p>;
 
     switch (activeTab) {
       case "Dashboard":
         return <Dashboard key={`dash-${renderKey}`} data={response} />;
       case "Insights":
-        return <Insights key={`insights-${renderKey}`} data={response} />;
+        return (
+          <Insights
+            key={`insights-${renderKey}`}
+            data={response}
+            streaming={streaming}
+          />
+        );
       case "Trends":
-        // Pass the uploaded file reference for on-demand trend generation
-        return <Trends key={`trends-${renderKey}`} uploadedFile={file} />;
+        // Pass the server-side dataset ID (file kept only as a fallback if the session expired)
+        return (
+          <Trends
+            key={`trends-${renderKey}`}
+            datasetId={response.datasetId}
+            uploadedFile={file}
+          />
+        );
       default:
         return null;
     }
@@ -107,10 +172,10 @@ export default function App() {
 
         <button
           onClick={handleUpload}
-          disabled={loading}
+          disabled={loading || streaming}
           className="upload-btn"
         >
-          {loading ? "Processing..." : "Upload & Generate"}
+          {loading || streaming ? "Processing..." : "Upload & Generate"}
         </button>
       </div>
 
@@ -1,6 +1,6 @@
 import React from "react";
 
-export default function Insights({ data }) {
+export default function Insights({ data, streaming }) {
   console.log("🧩 Insights data received:", data);
 
   if (!data || !data.insights || Object.keys(data.insights).length === 0) {
@@ -36,6 +36,27 @@ export default function Insights({ data }) {
           </ul>
         </div>
       ))}
+
+      {/* Detailed RAG analysis — entries arrive one by one while the upload streams */}
+      {(data.detailedInsights || []).length > 0 && (
+        <div style={{ marginBottom: "1.5rem" }}>
+          <h3
+            style={{
+              fontSize: "1rem",
+              fontWeight: 600,
+              color: "#2e3644ff",
+              marginBottom: "0.5rem",
+            }}
+          >
+            Detailed Analysis
+          </h3>
+          {data.detailedInsights.map((text, i) => (
+            <p key={i} style={{ fontSize: "0.8rem", whiteSpace: "pre-line" }}>
+              {text ?? (streaming ? "Generating detailed insight… ⏳" : "")}
+            </p>
+          ))}
+        </div>
+      )}
     </div>
     </div>
   );
@@ -21,14 +21,15 @@ ChartJS.register(
   Filler
 );
 
-export default function Trends({ uploadedFile }) {
+export default function Trends({ datasetId, uploadedFile }) {
   const [trends, setTrends] = useState(null);
+  const [sessionId, setSessionId] = useState(datasetId);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
 
   // ✅ Function to trigger backend trends generation
   const handleGenerateTrends = async () => {
-    if (!uploadedFile) {
+    if (!sessionId && !uploadedFile) {
       alert("Please upload a CSV first!");
       return;
     }
@@ -36,18 +37,27 @@ export default function Trends({ uploadedFile }) {
     setLoading(true);
     setError(null);
 
-    try {
+    const requestTrends = (withFile) => {
       const formData = new FormData();
-      formData.append("file", uploadedFile);
-
-      const response = await fetch("http://localhost:8000/trends", {
+      if (sessionId) formData.append("dataset_id", sessionId);
+      if (withFile) formData.append("file", uploadedFile);
+      return fetch("http://localhost:8000/trends", {
         method: "POST",
         body: formData,
       });
+    };
+
+    try {
+      // Reference the dataset parsed by /upload; re-send the file only if the session expired
+      let response = await requestTrends(!sessionId);
+      if (response.status === 404 && uploadedFile) {
+        response = await requestTrends(true);
+      }
 
       if (!response.ok) throw new Error("Failed to generate trends");
 
       const data = await response.json();
+      if (data.dataset_id) setSessionId(data.dataset_id);
       setTrends(data.trends);
     } catch (err) {
       console.error("⚠️ Trend generation error:", err);
@@ -96,28 +106,31 @@ export default function Trends({ uploadedFile }) {
     );
   }
 
-  // ✅ Prepare chart data
+  // ✅ Prepare chart data (one line per forecast series: targets and/or segments)
   const labels = forecastData.labels || forecastData.x || [];
-  const values =
-    (forecastData.series && forecastData.series[0]?.values) || forecastData.y || [];
-  const yName =
-    (forecastData.series && forecastData.series[0]?.name) ||
-    forecastData.y_col ||
-    "Forecast";
-
+  const series =
+    forecastData.series && forecastData.series.length > 0
+      ? forecastData.series
+      : [{ name: forecastData.y_col || "Forecast", values: forecastData.y || [] }];
+  const yName = forecastData.segment_by
+    ? `${forecastData.y_col} by ${forecastData.segment_by}`
+    : series.length > 1
+    ? series.map((s) => s.name).join(", ")
+    : series[0]?.name || forecastData.y_col || "Forecast";
+
+  const palette = ["56, 189, 248", "250, 204, 21", "74, 222, 128", "248, 113, 113", "192, 132, 252", "251, 146, 60", "45, 212, 191", "244, 114, 182"];
   const chartData = {
     labels,
-    datasets: [
-      {
-        label: `Forecasted ${yName}`,
-        data: values,
-        borderColor: "rgba(56, 189, 248, 1)",
-        // backgroundColor: "rgba(56, 189, 248, 0.15)",
-        borderWidth: 2,
-        tension: 0.4,
-        // fill: true,
-      },
-    ],
+    datasets: series.map((s, i) => ({
+      label: `Forecasted ${s.name}`,
+      data: s.values,
+      borderColor: `rgba(${palette[i % palette.length]}, 1)`,
+      // backgroundColor: "rgba(56, 189, 248, 0.15)",
+      borderWidth: 2,
+      tension: 0.4,
+      spanGaps: true,
+      // fill: true,
+    })),
   };
 
   const chartOptions = {
@@ -0,0 +1,168 @@
+import threading
+import importlib.util
+
+import httpx
+
+from core.config import (
+    OPENAI_API_KEY,
+    LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_MAX_RETRIES,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP2_ENABLED,
+    HTTP_CONNECT_TIMEOUT_SECONDS,
+    HTTP_READ_TIMEOUT_SECONDS,
+    EMBEDDING_BACKEND,
+    LOCAL_EMBEDDING_DIM,
+    EMBEDDING_MODEL,
+    EMBEDDING_BASE_URL,
+    EMBEDDING_BATCH_TOKENS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_CONCURRENCY,
+    EMBEDDING_MAX_RETRIES,
+)
+from core.embeddings import BatchedEmbeddings, HashingEmbeddings
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        print("⚠️ HTTP/2 requested but the h2 package is not installed; using HTTP/1.1 keep-alive")
+        return False
+    return True
+
+
+def _pool_settings() -> dict:
+    """Connection-pool limits and timeouts shared by the sync and async pools."""
+    return {
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        "timeout": httpx.Timeout(HTTP_READ_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+    }
+
+
+class ClientFactory:
+    """
+    Network clients, built once on first use and closed by the app lifespan.
+    - One sync and one async httpx connection pool (bounded, kept alive, HTTP/2 when h2 is
+      installed) shared by every OpenAI client built here, so concurrent uploads reuse
+      warm connections instead of each opening its own
+    - openai() / async_openai(): SDK clients on those pools, one per (api_key, base_url, max_retries)
+    - chat_model(): the LangChain ChatOpenAI model (langchain_openai takes seconds to
+      import, so it is only imported when the first LLM call needs it)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._http = None
+        self._async_http = None
+        self._http2 = None
+        self._openai = {}
+        self._async_openai = {}
+        self._chat_model = None
+
+    def _use_http2(self) -> bool:
+        if self._http2 is None:
+            self._http2 = _http2_available()
+        return self._http2
+
+    @property
+    def http(self) -> httpx.Client:
+        with self._lock:
+            if self._http is None:
+                self._http = httpx.Client(http2=self._use_http2(), **_pool_settings())
+            return self._http
+
+    @property
+    def async_http(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_http is None:
+                self._async_http = httpx.AsyncClient(http2=self._use_http2(), **_pool_settings())
+            return self._async_http
+
+    def openai(self, api_key: str = None, base_url: str = None, max_retries: int = LLM_MAX_RETRIES):
+        """Sync OpenAI SDK client on the shared pool."""
+        key = (api_key or OPENAI_API_KEY, base_url, max_retries)
+        client = self._openai.get(key)
+        if client is None:
+            from openai import OpenAI
+            http = self.http
+            with self._lock:
+                client = self._openai.get(key)
+                if client is None:
+                    client = OpenAI(api_key=key[0], base_url=base_url,
+                                    max_retries=max_retries, http_client=http)
+                    self._openai[key] = client
+        return client
+
+    def async_openai(self, api_key: str = None, base_url: str = None, max_retries: int = LLM_MAX_RETRIES):
+        """Async OpenAI SDK client on the shared pool."""
+        key = (api_key or OPENAI_API_KEY, base_url, max_retries)
+        client = self._async_openai.get(key)
+        if client is None:
+            from openai import AsyncOpenAI
+            async_http = self.async_http
+            with self._lock:
+                client = self._async_openai.get(key)
+                if client is None:
+                    client = AsyncOpenAI(api_key=key[0], base_url=base_url,
+                                         max_retries=max_retries, http_client=async_http)
+                    self._async_openai[key] = client
+        return client
+
+    def chat_model(self):
+        if self._chat_model is None:
+            from langchain_openai import ChatOpenAI
+            http, async_http = self.http, self.async_http
+            with self._lock:
+                if self._chat_model is None:
+                    self._chat_model = ChatOpenAI(
+                        temperature=LLM_TEMPERATURE,
+                        model=LLM_MODEL,
+                        openai_api_key=OPENAI_API_KEY,
+                        max_retries=LLM_MAX_RETRIES,
+                        timeout=HTTP_READ_TIMEOUT_SECONDS,
+                        http_client=http,
+                        http_async_client=async_http,
+                    )
+        return self._chat_model
+
+    async def aclose(self):
+        """Close the shared connection pools (clients built later get fresh ones)."""
+        with self._lock:
+            http, async_http = self._http, self._async_http
+            self._http = self._async_http = self._chat_model = None
+            self._openai.clear()
+            self._async_openai.clear()
+        if async_http is not None:
+            await async_http.aclose()
+        if http is not None:
+            http.close()
+
+
+clients = ClientFactory()
+
+
+def build_embeddings():
+    """Document embeddings for the RAG index: OpenAI over the shared pools, or local hashing."""
+    if EMBEDDING_BACKEND == "local":
+        return HashingEmbeddings(dim=LOCAL_EMBEDDING_DIM)
+    return BatchedEmbeddings(
+        model=EMBEDDING_MODEL,
+        api_key=OPENAI_API_KEY,
+        base_url=EMBEDDING_BASE_URL,
+        max_batch_tokens=EMBEDDING_BATCH_TOKENS,
+        max_batch_size=EMBEDDING_BATCH_SIZE,
+        max_concurrency=EMBEDDING_CONCURRENCY,
+        max_retries=EMBEDDING_MAX_RETRIES,
+        clients=clients,
+    )
+
+
+embeddings = build_embeddings()
@@ -1,11 +1,110 @@
 import os
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 
+# Chat model (built on first use by core.clients, so the app starts without a key)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-llm = ChatOpenAI(
-    temperature=0.3,
-    model="gpt-4o-mini",
-    openai_api_key=OPENAI_API_KEY
-)
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+# Set WARMUP_ON_STARTUP=1 to import heavy dependencies and build clients in the background at boot
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0").lower() in ("1", "true", "yes")
 
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
+# Embeddings backend: "openai" (token-aware batches sent concurrently to any OpenAI-compatible
+# endpoint; EMBEDDING_BASE_URL can point at a local fake server for tests) or "local"
+# (CPU-only feature hashing, no network)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+LOCAL_EMBEDDING_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "1024"))
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+EMBEDDING_BASE_URL = os.getenv("EMBEDDING_BASE_URL") or None
+EMBEDDING_BATCH_TOKENS = int(os.getenv("EMBEDDING_BATCH_TOKENS", "100000"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "5"))
+
+# Shared HTTP connection pools for all OpenAI traffic (chat + embeddings, see core.clients).
+# HTTP/2 multiplexes concurrent requests over one kept-alive connection (needs the h2 package).
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1").lower() in ("1", "true", "yes")
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "120"))
+# SDK-level retries (with backoff) for chat calls; embeddings retry in BatchedEmbeddings
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Indexes with at most this many documents use exact NumPy search instead of FAISS
+BRUTE_FORCE_MAX_DOCS = int(os.getenv("BRUTE_FORCE_MAX_DOCS", "1000"))
+
+# Dataset session store (parsed uploads reused by /trends and later endpoints)
+DATASET_STORE_MAX_ITEMS = int(os.getenv("DATASET_STORE_MAX_ITEMS", "8"))
+DATASET_STORE_TTL_SECONDS = int(os.getenv("DATASET_STORE_TTL_SECONDS", "3600"))
+DATASET_STORE_MAX_BYTES = int(os.getenv("DATASET_STORE_MAX_MB", "2048")) * 1024 * 1024
+
+# Dashboard result cache (keyed by upload content hash + pipeline version).
+# Bump PIPELINE_VERSION whenever prompts or aggregation logic change the output.
+PIPELINE_VERSION = "6"
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(".cache", "results"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+# RAG caches: column-document embeddings keyed by text hash + embedding model,
+# saved FAISS indexes keyed by dataset content hash
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(".cache", "embeddings"))
+RAG_INDEX_CACHE_DIR = os.getenv("RAG_INDEX_CACHE_DIR", os.path.join(".cache", "faiss"))
+RAG_INDEX_CACHE_MAX_ITEMS = int(os.getenv("RAG_INDEX_CACHE_MAX_ITEMS", "32"))
+
+# Bounded worker pool for CPU-bound pandas / FAISS / Prophet work
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(8, os.cpu_count() or 2))))
+# Process pool for fitting many forecast models at once (multi-target / per-segment trends)
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(os.cpu_count() or 2)))
+
+# Trends: the (ds, y) series is resampled to TREND_FREQ before fitting ("auto" picks daily /
+# weekly / monthly from the data, coarsening until it fits TREND_MAX_POINTS). Series longer
+# than TREND_PROPHET_MAX_POINTS periods use the fast NumPy forecaster instead of Prophet.
+TREND_FREQ = os.getenv("TREND_FREQ", "auto")
+TREND_HORIZON = int(os.getenv("TREND_HORIZON", "15"))
+TREND_MAX_POINTS = int(os.getenv("TREND_MAX_POINTS", "500"))
+TREND_PROPHET_MAX_POINTS = int(os.getenv("TREND_PROPHET_MAX_POINTS", "2000"))
+# ds / y columns are picked by a local detector over the first TREND_DETECT_ROWS rows; the LLM
+# is only asked when its confidence (0–1) is below TREND_DETECT_MIN_CONFIDENCE and a key is set
+TREND_DETECT_ROWS = int(os.getenv("TREND_DETECT_ROWS", "1000"))
+TREND_DETECT_MIN_CONFIDENCE = float(os.getenv("TREND_DETECT_MIN_CONFIDENCE", "0.6"))
+# Forecasts are cached on disk by series fingerprint; fitted Prophet parameters of the
+# last FORECAST_WARM_START_ITEMS series are kept in memory to warm-start tail-appended refits
+FORECAST_CACHE_DIR = os.getenv("FORECAST_CACHE_DIR", os.path.join(".cache", "forecasts"))
+FORECAST_CACHE_MAX_BYTES = int(os.getenv("FORECAST_CACHE_MAX_MB", "64")) * 1024 * 1024
+FORECAST_WARM_START_ITEMS = int(os.getenv("FORECAST_WARM_START_ITEMS", "32"))
+# Multi-series trends: at most this many targets, and the largest TREND_MAX_SEGMENTS segments
+TREND_MAX_TARGETS = int(os.getenv("TREND_MAX_TARGETS", "8"))
+TREND_MAX_SEGMENTS = int(os.getenv("TREND_MAX_SEGMENTS", "8"))
+
+# Chart payloads: line charts and forecasts are reduced to the client's requested point count
+# (default LINE_CHART_MAX_POINTS / TREND_MAX_POINTS, capped at CHART_MAX_POINTS_LIMIT) with a
+# shape-preserving algorithm: "lttb" (Largest-Triangle-Three-Buckets) or "minmax" (per bucket)
+CHART_DOWNSAMPLE_METHOD = os.getenv("CHART_DOWNSAMPLE_METHOD", "lttb")
+LINE_CHART_MAX_POINTS = int(os.getenv("LINE_CHART_MAX_POINTS", "100"))
+CHART_MAX_POINTS_LIMIT = int(os.getenv("CHART_MAX_POINTS_LIMIT", "5000"))
+# Distinct timestamps a time-series chart aggregates exactly before flooring the time axis
+# onto a coarser grid (keeps chunked aggregation bounded on long, fine-grained files)
+TIME_SERIES_MAX_GROUPS = int(os.getenv("TIME_SERIES_MAX_GROUPS", "50000"))
+
+# LLM gateway: replies cached on disk by prompt hash for LLM_CACHE_TTL_SECONDS (0 disables),
+# so identical schema / EDA prompts are answered once
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Prompt budgets (tokens): the planning prompt keeps the most relevant columns' EDA stats,
+# names and sample values within PROMPT_EDA_MAX_TOKENS; each insight call gets at most
+# INSIGHT_CONTEXT_MAX_TOKENS of retrieved context (and no EDA dump)
+PROMPT_EDA_MAX_TOKENS = int(os.getenv("PROMPT_EDA_MAX_TOKENS", "4000"))
+INSIGHT_CONTEXT_MAX_TOKENS = int(os.getenv("INSIGHT_CONTEXT_MAX_TOKENS", "1500"))
+
+# RAG insight refinement fan-out
+INSIGHT_MAX_TOPICS = int(os.getenv("INSIGHT_MAX_TOPICS", "5"))
+INSIGHT_CONCURRENCY = int(os.getenv("INSIGHT_CONCURRENCY", "5"))
+INSIGHT_TIMEOUT_SECONDS = float(os.getenv("INSIGHT_TIMEOUT_SECONDS", "60"))
+
+# Upload ingestion: uploads are spooled in memory up to UPLOAD_SPOOL_MEMORY_MB, then to disk.
+# Files larger than LARGE_UPLOAD_MB are processed in CSV_CHUNK_ROWS chunks (constant-memory mode).
+UPLOAD_SPOOL_MEMORY_BYTES = int(os.getenv("UPLOAD_SPOOL_MEMORY_MB", "64")) * 1024 * 1024
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or None
+LARGE_UPLOAD_BYTES = int(os.getenv("LARGE_UPLOAD_MB", "512")) * 1024 * 1024
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "200000"))
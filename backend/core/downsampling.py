@@ -0,0 +1,88 @@
+import numpy as np
+
+
+# --------------------------------------------------
+# Shape-preserving downsampling for chart payloads
+# Both algorithms return sorted positional indices into the input, always keep
+# the first and last point, and return every index when the series already fits.
+# --------------------------------------------------
+def _bucket_edges(n: int, n_buckets: int):
+    """Split the inner points 1 .. n-2 into n_buckets contiguous, non-empty buckets."""
+    return np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+
+
+def lttb_indices(y, n_out: int, x=None):
+    """
+    Largest-Triangle-Three-Buckets.
+    - Inner points are split into n_out - 2 buckets
+    - Each bucket keeps the point forming the largest triangle with the point
+      kept from the previous bucket and the mean of the next bucket
+    Bucket means are computed in one reduceat pass; the per-bucket selection
+    depends on the previous pick, so only that step loops (over buckets, not points).
+    y must be finite; x defaults to positions (evenly spaced).
+    """
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    n_out = max(n_out, 3)
+    if n_out >= n:
+        return np.arange(n)
+    x = np.arange(n, dtype="float64") if x is None else np.asarray(x, dtype="float64")
+
+    edges = _bucket_edges(n, n_out - 2)
+    sizes = np.diff(edges)
+    # Mean of each bucket; the "next bucket" of the last one is the final point
+    mean_x = np.add.reduceat(x[: n - 1], edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y[: n - 1], edges[:-1]) / sizes
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area (a, candidate, next-bucket mean); the constant factor is irrelevant
+        area = np.abs((ax - next_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[i] - ay))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out: int):
+    """
+    Min/max per bucket: inner points are split into (n_out - 2) // 2 buckets and
+    each keeps its lowest and highest point, so every peak and trough survives.
+    Fully vectorized (reduceat + one pass to locate the extremes); NaNs are ignored.
+    At least 4 points are kept (both ends + one bucket).
+    """
+    y = np.asarray(y, dtype="float64")
+    n = len(y)
+    n_out = max(n_out, 4)
+    if n_out >= n:
+        return np.arange(n)
+    n_buckets = (n_out - 2) // 2
+
+    edges = _bucket_edges(n, n_buckets)
+    inner = y[1: n - 1]
+    starts = edges[:-1] - 1
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    lows = np.fmin.reduceat(inner, starts)[bucket]
+    highs = np.fmax.reduceat(inner, starts)[bucket]
+
+    # First position in each bucket that equals its min (resp. max)
+    positions = np.arange(1, n - 1)
+    picks = [0, n - 1]
+    for is_extreme in (inner == lows, inner == highs):
+        _, first = np.unique(bucket[is_extreme], return_index=True)
+        picks.append(positions[is_extreme][first])
+    return np.unique(np.concatenate([np.atleast_1d(p) for p in picks]))
+
+
+def downsample_indices(y, n_out: int, x=None, method: str = "lttb"):
+    """Indices of at most n_out points of y chosen by `method` ("lttb" or "minmax")."""
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    if method == "lttb":
+        return lttb_indices(y, n_out, x)
+    raise ValueError(f"Unknown downsampling method '{method}' (expected 'lttb' or 'minmax').")
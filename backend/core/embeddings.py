@@ -0,0 +1,219 @@
+import asyncio
+import functools
+import math
+import random
+import re
+import time
+import zlib
+from collections import Counter
+
+import numpy as np
+
+from langchain_core.embeddings import Embeddings
+
+
+@functools.lru_cache(maxsize=None)
+def _retryable_errors():
+    """Errors worth retrying: rate limits, timeouts, dropped connections, 5xx (openai imported on first use)."""
+    import openai
+    return (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+
+
+def _token_counter(model: str):
+    """tiktoken counter for the model; falls back to ~4 chars/token when encodings are unavailable (offline)."""
+    try:
+        import tiktoken
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return enc
+    except Exception as e:
+        print(f"⚠️ tiktoken unavailable ({e}), estimating tokens from text length")
+        return None
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    OpenAI-compatible embeddings with size-aware batching and bounded parallel dispatch.
+    - Documents are packed into batches of at most max_batch_tokens tokens / max_batch_size inputs
+    - Up to max_concurrency batch requests are in flight at once
+    - Rate limits, timeouts and 5xx errors are retried with exponential backoff + jitter
+    - base_url points the client at any OpenAI-compatible server (e.g. a local fake for tests)
+    - clients: a core.clients.ClientFactory whose shared connection pools carry the requests
+      (without one, private SDK clients are created)
+    Inputs longer than max_input_tokens are truncated.
+    """
+
+    def __init__(self, model: str, api_key: str = None, base_url: str = None,
+                 max_batch_tokens: int = 100000, max_batch_size: int = 512,
+                 max_concurrency: int = 4, max_retries: int = 5,
+                 backoff_seconds: float = 0.5, max_input_tokens: int = 8191, clients=None):
+        self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_input_tokens = max_input_tokens
+        self._encoder = None
+        self._encoder_loaded = False
+        self.clients = clients
+        self._client = None
+        self._async_client = None
+
+    # ---- clients (created lazily; retries are handled here, not by the SDK) ----
+    @property
+    def client(self):
+        if self.clients is not None:
+            return self.clients.openai(self.api_key, self.base_url, max_retries=0)
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return self._client
+
+    @property
+    def async_client(self):
+        if self.clients is not None:
+            return self.clients.async_openai(self.api_key, self.base_url, max_retries=0)
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        return self._async_client
+
+    # ---- batching ----
+    def _prepare(self, text: str):
+        """Return (text, token count), truncating inputs over the per-input limit."""
+        if not self._encoder_loaded:
+            self._encoder = _token_counter(self.model)
+            self._encoder_loaded = True
+        text = text or " "
+        if self._encoder is None:
+            n_tokens = len(text) // 4 + 1
+            if n_tokens > self.max_input_tokens:
+                text = text[: self.max_input_tokens * 4]
+                n_tokens = self.max_input_tokens
+            return text, n_tokens
+        tokens = self._encoder.encode(text)
+        if len(tokens) > self.max_input_tokens:
+            tokens = tokens[: self.max_input_tokens]
+            text = self._encoder.decode(tokens)
+        return text, len(tokens)
+
+    def _batches(self, texts):
+        """Pack texts into (start index, [texts]) batches in input order."""
+        batches, current, current_tokens, start = [], [], 0, 0
+        for i, text in enumerate(texts):
+            text, n_tokens = self._prepare(text)
+            if current and (current_tokens + n_tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append((start, current))
+                current, current_tokens, start = [], 0, i
+            current.append(text)
+            current_tokens += n_tokens
+        if current:
+            batches.append((start, current))
+        return batches
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+
+    # ---- sync API ----
+    def _embed_batch(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.client.embeddings.create(model=self.model, input=batch)
+                return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+            except _retryable_errors() as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"⚠️ Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts):
+        vectors = [None] * len(texts)
+        for start, batch in self._batches(texts):
+            vectors[start:start + len(batch)] = self._embed_batch(batch)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    # ---- async API ----
+    async def _aembed_batch(self, batch, semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    resp = await self.async_client.embeddings.create(model=self.model, input=batch)
+                    return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+                except _retryable_errors() as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    print(f"⚠️ Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def aembed_documents(self, texts):
+        batches = self._batches(texts)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results = await asyncio.gather(*(self._aembed_batch(batch, semaphore) for _, batch in batches))
+
+        vectors = [None] * len(texts)
+        for (start, batch), embedded in zip(batches, results):
+            vectors[start:start + len(batch)] = embedded
+        return vectors
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+# --------------------------------------------------
+# Local, offline backend
+# --------------------------------------------------
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    CPU-only embeddings for air-gapped deployments: signed feature hashing of word
+    unigrams + bigrams with sublinear term frequency, L2-normalized.
+    snake_case / camelCase column names are split into words first.
+    Vectors are stable across processes (crc32, not Python's salted hash), so
+    saved indexes stay valid; there is no IDF term, which would need a fitted corpus.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.model = f"hashing-{dim}"
+
+    def _vector(self, text: str):
+        text = re.sub(r"([a-z])([A-Z])", r"\1 \2", text).replace("_", " ").lower()
+        words = _TOKEN_RE.findall(text)
+        counts = Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+
+        vec = np.zeros(self.dim, dtype="float32")
+        for term, tf in counts.items():
+            h = zlib.crc32(term.encode())
+            vec[h % self.dim] += (1.0 + math.log(tf)) * (1.0 if h & 0x80000000 else -1.0)
+        norm = np.linalg.norm(vec)
+        return (vec / norm if norm else vec).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
@@ -0,0 +1,70 @@
+import asyncio
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core.config import CPU_POOL_WORKERS, PROCESS_POOL_WORKERS
+
+# Threads rather than processes: DataFrames are shared without pickling, pandas/NumPy
+# release the GIL in their heavy kernels and Prophet fits run inside cmdstan.
+cpu_pool = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix="cpu-worker")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking / CPU-bound call in the bounded pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_pool, functools.partial(func, *args, **kwargs))
+
+
+# Processes for batches of model fits that would otherwise contend for the GIL.
+# Created on first use; "spawn" avoids forking a server that already runs threads.
+_process_pool = None
+_process_pool_lock = threading.Lock()   # warm-up thread and requests may both create it
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop `pool` if it is still the current one; the next get_process_pool() starts a new pool."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_process_pool():
+    """Stop the worker processes (app shutdown); a later run_in_process starts a new pool."""
+    pool = _process_pool
+    if pool is not None:
+        _discard_process_pool(pool)
+
+
+async def run_in_process(func, *args, **kwargs):
+    """
+    Run a picklable module-level function in the process pool (arguments are pickled).
+    A worker dying (e.g. killed for memory) breaks the whole pool: it is replaced and the
+    call retried once, so later requests are not failed until a restart.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    for attempt in range(2):
+        pool = get_process_pool()
+        try:
+            return await loop.run_in_executor(pool, call)
+        except BrokenProcessPool:
+            _discard_process_pool(pool)
+            if attempt:
+                raise
+            print("⚠️ Process pool broke (a worker died); restarting it and retrying")
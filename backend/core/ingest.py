@@ -0,0 +1,148 @@
+import io
+import os
+import hashlib
+import tempfile
+import weakref
+
+import pandas as pd
+
+from core.config import (
+    UPLOAD_SPOOL_MEMORY_BYTES,
+    UPLOAD_SPOOL_DIR,
+    LARGE_UPLOAD_BYTES,
+    CSV_CHUNK_ROWS,
+)
+from core.executor import run_blocking
+from core.profiling import ProfileAccumulator
+from core.schema import detect_date_columns, optimize_dtypes, parse_date_columns
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SpooledUpload:
+    """
+    An uploaded CSV held in memory (small files) or in a temp file (large files),
+    together with its SHA-256 content hash. Every reader opens its own handle,
+    so concurrent reads (e.g. /trends during a chunked upload) are safe.
+    The temp file is deleted once the last reference goes away.
+    """
+
+    def __init__(self, digest: str, size: int, data: bytes = None, path: str = None):
+        self.digest = digest
+        self.size = size
+        self._data = data
+        self.path = path
+        if path is not None:
+            weakref.finalize(self, _remove_file, path)
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self._data) if self._data is not None else 0
+
+    @property
+    def is_large(self) -> bool:
+        """True when the upload should be processed in constant-memory chunked mode."""
+        return self.size > LARGE_UPLOAD_BYTES
+
+    def open(self):
+        return io.BytesIO(self._data) if self._data is not None else open(self.path, "rb")
+
+    def read_csv(self, **kwargs) -> pd.DataFrame:
+        with self.open() as f:
+            return pd.read_csv(f, **kwargs)
+
+    def iter_chunks(self, chunksize: int = CSV_CHUNK_ROWS, **kwargs):
+        with self.open() as f, pd.read_csv(f, chunksize=chunksize, **kwargs) as reader:
+            yield from reader
+
+
+async def spool_upload(file, chunk_size: int = 1024 * 1024) -> SpooledUpload:
+    """Stream an UploadFile into memory / a temp file, hashing it on the way."""
+    hasher = hashlib.sha256()
+    buffer, tmp, size = io.BytesIO(), None, 0
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+
+            if tmp is None and size > UPLOAD_SPOOL_MEMORY_BYTES:
+                tmp = tempfile.NamedTemporaryFile(
+                    prefix="upload-", suffix=".csv", dir=UPLOAD_SPOOL_DIR, delete=False
+                )
+                await run_blocking(tmp.write, buffer.getvalue())
+                buffer = None
+            if tmp is not None:
+                await run_blocking(tmp.write, chunk)
+            else:
+                buffer.write(chunk)
+    except BaseException:
+        if tmp is not None:
+            tmp.close()
+            _remove_file(tmp.name)
+        raise
+
+    if tmp is None:
+        return SpooledUpload(hasher.hexdigest(), size, data=buffer.getvalue())
+    tmp.close()
+    return SpooledUpload(hasher.hexdigest(), size, path=tmp.name)
+
+
+def load_dataframe(upload: SpooledUpload) -> pd.DataFrame:
+    """Parse the whole upload and convert it to compact dtypes (runs in the worker pool)."""
+    return optimize_dtypes(upload.read_csv())
+
+
+def iter_chunks_with_dates(upload: SpooledUpload, **kwargs):
+    """
+    upload.iter_chunks() with the load-time date parsing: date columns and their
+    convention are detected on the first chunk and applied to every chunk, so the
+    constant-memory passes see the same datetime columns as an in-memory load.
+    """
+    conventions = None
+    for chunk in upload.iter_chunks(**kwargs):
+        if conventions is None:
+            conventions = detect_date_columns(chunk)
+        yield parse_date_columns(chunk, conventions)
+
+
+def read_with_dates(upload: SpooledUpload, **kwargs) -> pd.DataFrame:
+    """read_csv of part of the upload (rows / columns) with the load-time date parsing applied."""
+    return parse_date_columns(upload.read_csv(**kwargs))
+
+
+def profile_csv_chunks(upload: SpooledUpload, sample_rows: int = 1000):
+    """
+    Constant-memory first pass: build the DatasetProfile chunk by chunk.
+    Returns (profile, sample_df) where sample_df holds the first rows for
+    prompts and previews.
+    """
+    acc = ProfileAccumulator()
+    sample = None
+    for chunk in iter_chunks_with_dates(upload):
+        if sample is None:
+            sample = chunk.head(sample_rows).copy()
+        acc.add(chunk)
+    profile = acc.result()
+    if sample is None:
+        sample = upload.read_csv(nrows=0)
+    print(f"📦 Profiled {profile.shape[0]} rows in chunks of {CSV_CHUNK_ROWS}")
+    return profile, sample
+
+
+def chunk_dtypes(profile) -> dict:
+    """Pin second-pass read dtypes to the profiled ones so every chunk agrees."""
+    pinned = {}
+    for c, dtype in profile.dtypes.items():
+        if c in profile.numeric_columns:
+            pinned[c] = dtype
+        elif dtype == "object":
+            pinned[c] = "object"
+    return pinned
@@ -0,0 +1,128 @@
+import json
+import re
+
+# Python / JS literals LLMs sometimes emit instead of JSON ones
+_LITERALS = {"True": "true", "False": "false", "None": "null", "undefined": "null", "NaN": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+# Opening quote -> closing quote; curly quotes only delimit strings when used outside one
+_QUOTES = {'"': '"', "'": "'", "“": "”", "”": "”", "‘": "’"}
+
+
+def _normalize(text: str):
+    """
+    One pass over the text outside / inside strings:
+    - single- and curly-quoted strings become double-quoted (curly quotes inside a string are
+      kept as text), raw newlines / tabs inside strings are escaped
+    - trailing commas before } or ] are dropped, Python literals become JSON ones
+    - // and # line comments are skipped
+    Returns (normalized text pieces, open bracket stack at the end, [(piece index, stack)] at
+    each comma) so truncated output can be closed or cut back to the last complete member.
+    """
+    out, stack, cuts = [], [], []
+    quote = None             # closing quote of the string being read, or None
+    i, n = 0, len(text)
+    while i < n:
+        ch = text[i]
+        if quote:
+            if ch == "\\" and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                out.append('\\"')            # double quote inside a single- or curly-quoted string
+            elif ch == "\n":
+                out.append("\\n")
+            elif ch == "\t":
+                out.append("\\t")
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in _QUOTES:
+            quote = _QUOTES[ch]
+            out.append('"')
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+        elif ch in "}]":
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(ch)
+        elif ch == ",":
+            cuts.append((len(out), list(stack)))
+            out.append(ch)
+        elif ch == "/" and text.startswith("//", i) or ch == "#":
+            while i < n and text[i] != "\n":
+                i += 1
+            continue
+        elif ch.isalpha():
+            word = re.match(r"\w+", text[i:]).group(0)
+            out.append(_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    if quote:
+        out.append('"')
+    return out, stack, cuts
+
+
+def _close(text: str, stack) -> str:
+    text = text.rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(_CLOSERS[b] for b in reversed(stack))
+
+
+def parse_json_lenient(text: str, max_cuts: int = 50):
+    """
+    Parse the first JSON object/array in an LLM reply without another model call.
+    Handles code fences and surrounding prose, single quotes, trailing commas,
+    Python literals, comments, unescaped newlines and output truncated mid-way
+    (open brackets are closed; an incomplete last member is dropped).
+    Raises ValueError when nothing parseable is found, or when only part of a complete
+    (not truncated) reply could be parsed.
+    """
+    text = re.sub(r"```[a-zA-Z]*", "", text or "")
+    starts = [p for p in (text.find("{"), text.find("[")) if p >= 0]
+    if not starts:
+        raise ValueError("No JSON object found in the reply.")
+    text = text[min(starts):]
+
+    # 1️⃣ Well-formed (JSON mode replies, or prose after the object)
+    try:
+        return json.JSONDecoder().raw_decode(text)[0]
+    except json.JSONDecodeError:
+        pass
+
+    # 2️⃣ Normalized + closed
+    pieces, stack, cuts = _normalize(text)
+    try:
+        return json.JSONDecoder().raw_decode(_close("".join(pieces), stack))[0]
+    except json.JSONDecodeError:
+        pass
+
+    # 3️⃣ Truncated inside a member: cut back to the last comma that leaves valid JSON.
+    # Brackets all closed means the reply was complete, so dropping members would lose data.
+    if not stack:
+        raise ValueError("Could not repair the JSON in the reply.")
+    for position, cut_stack in reversed(cuts[-max_cuts:]):
+        try:
+            data = json.JSONDecoder().raw_decode(_close("".join(pieces[:position]), cut_stack))[0]
+        except json.JSONDecodeError:
+            continue
+        print(f"⚠️ Truncated JSON reply: dropped the last {sum(map(len, pieces[position:]))} characters")
+        return data
+    raise ValueError("Could not repair the JSON in the reply.")
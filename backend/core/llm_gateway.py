@@ -0,0 +1,151 @@
+import time
+import json
+import asyncio
+import hashlib
+import threading
+
+from core.clients import clients
+from core.executor import run_blocking
+from core.config import (
+    PIPELINE_VERSION,
+    LLM_CACHE_DIR,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_TTL_SECONDS,
+)
+from core.result_cache import ResultCache
+
+
+def _message_pairs(messages):
+    """(role, content) pairs for a prompt given as a string, LangChain messages or role/content dicts."""
+    if isinstance(messages, str):
+        return [("human", messages)]
+    pairs = []
+    for m in messages:
+        if isinstance(m, dict):
+            pairs.append((m.get("role", "user"), m.get("content", "")))
+        else:
+            pairs.append((getattr(m, "type", "human"), m.content))
+    return pairs
+
+
+def _usage(res) -> dict:
+    """Token usage of a LangChain chat response (empty when the backend does not report it)."""
+    usage = getattr(res, "usage_metadata", None) or {}
+    if usage:
+        return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    usage = (getattr(res, "response_metadata", None) or {}).get("token_usage") or {}
+    return {"input_tokens": usage.get("prompt_tokens", 0), "output_tokens": usage.get("completion_tokens", 0)}
+
+
+class LLMGateway:
+    """
+    Single entry point for every chat-completion call.
+    - Responses are cached on disk by prompt hash (model + call params + messages) for ttl_seconds
+    - Concurrent identical prompts share one in-flight call
+    - Per-call latency and token counts are logged and summed in metrics()
+    backend: any object with `async ainvoke(messages, **params)` returning a message with
+    `.content`; resolved through backend_factory on every call (the shared LangChain chat
+    model by default, rebuilt after the lifespan closes its pools), unless tests pin one
+    via set_backend().
+    """
+
+    def __init__(self, backend_factory, cache: ResultCache, ttl_seconds: int):
+        self._backend = None         # set_backend() override
+        self._backend_factory = backend_factory
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self._inflight = {}          # prompt hash -> asyncio.Task
+        self._lock = threading.Lock()
+        self._metrics = {
+            "calls": 0, "cache_hits": 0, "coalesced": 0, "errors": 0,
+            "input_tokens": 0, "output_tokens": 0, "latency_seconds": 0.0,
+        }
+
+    @property
+    def backend(self):
+        if self._backend is not None:
+            return self._backend
+        return self._backend_factory()
+
+    def set_backend(self, backend):
+        """Pin the model backend (e.g. a local stub; None restores the factory); in-flight calls are unaffected."""
+        self._backend = backend
+
+    def _model_name(self) -> str:
+        backend = self.backend
+        return str(getattr(backend, "model_name", None) or getattr(backend, "model", None) or type(backend).__name__)
+
+    def _key(self, messages, params) -> str:
+        payload = {
+            "model": self._model_name(),
+            "temperature": getattr(self.backend, "temperature", None),
+            "params": params,
+            "messages": _message_pairs(messages),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _record(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._metrics[name] += value
+
+    def metrics(self) -> dict:
+        """Cumulative counters since startup (calls, cache hits, coalesced waits, tokens, latency)."""
+        with self._lock:
+            snapshot = dict(self._metrics)
+        snapshot["avg_latency_seconds"] = (
+            snapshot["latency_seconds"] / snapshot["calls"] if snapshot["calls"] else 0.0
+        )
+        return snapshot
+
+    async def forget(self, messages, **params):
+        """Drop a cached reply (e.g. one the caller could not use)."""
+        await run_blocking(self.cache.delete, self._key(messages, params))
+
+    # ---- calls ----
+    async def complete(self, messages, **params) -> str:
+        """Text of the model's reply to `messages` (params such as max_tokens go to the backend)."""
+        key = self._key(messages, params)
+
+        # 1️⃣ Answered recently → serve from cache (disk I/O off the event loop)
+        if self.ttl_seconds > 0:
+            cached = await run_blocking(self.cache.get, key)
+            if cached is not None and time.time() - cached["created"] <= self.ttl_seconds:
+                self._record(cache_hits=1)
+                return cached["content"]
+
+        # 2️⃣ Same prompt already in flight → wait for that call
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(key, messages, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._record(coalesced=1)
+        # Shielded: one waiter timing out must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _call(self, key, messages, params) -> str:
+        start = time.perf_counter()
+        try:
+            res = await self.backend.ainvoke(messages, **params)
+        except Exception:
+            self._record(errors=1)
+            raise
+        latency = time.perf_counter() - start
+        usage = _usage(res)
+        self._record(calls=1, latency_seconds=latency, **usage)
+        print(f"🤖 LLM call {key[:8]}: {latency:.2f}s, "
+              f"{usage.get('input_tokens', 0)} → {usage.get('output_tokens', 0)} tokens")
+
+        content = res.content
+        if self.ttl_seconds > 0:
+            await run_blocking(self.cache.put, key, {"created": time.time(), "content": content})
+        return content
+
+
+llm_gateway = LLMGateway(
+    clients.chat_model,
+    ResultCache(LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, PIPELINE_VERSION),
+    LLM_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,275 @@
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from core.schema import is_numeric
+
+
+@dataclass
+class DatasetProfile:
+    """
+    Column statistics computed once per upload and shared by every consumer
+    (EDA summary, RAG column documents, agent prompt).
+    """
+    shape: tuple
+    dtypes: dict                     # column -> dtype string
+    n_missing: dict                  # column -> missing count
+    n_unique: dict                   # column -> distinct non-null count
+    numeric_stats: dict              # column -> {"mean", "std", "min", "max"} (numeric + bool columns)
+    top_values: dict                 # column -> {value: count} (top-k, non-numeric columns)
+    samples: dict                    # column -> first non-null values as strings
+    numeric_columns: list            # numeric columns (excludes bool)
+    corr: pd.DataFrame = field(default=None, repr=False)  # |correlation| of numeric columns
+
+    def top_correlations(self, n: int = 10):
+        """Strongest off-diagonal |correlations| as [((a, b), value), ...]."""
+        if self.corr is None or len(self.corr.columns) < 2:
+            return []
+        pairs = self.corr.unstack().sort_values(ascending=False)
+        return list(pairs[pairs < 1].head(n).items())
+
+
+def profile_dataframe(df: pd.DataFrame, top_k: int = 5, n_samples: int = 5) -> DatasetProfile:
+    """Single vectorized profiling pass over the DataFrame."""
+    stat_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
+    number_cols = [c for c in df.columns if is_numeric(df[c].dtype)]
+    other_cols = [c for c in df.columns if c not in set(number_cols)]
+
+    # 1️⃣ Missing counts + numeric summary stats (one columnar pass each)
+    n_missing = df.isna().sum().astype(int).to_dict()
+    numeric_stats = {}
+    if stat_cols:
+        stats = df[stat_cols].agg(["mean", "std", "min", "max"])
+        numeric_stats = {
+            c: {k: float(v) if pd.notna(v) else float("nan") for k, v in stats[c].items()}
+            for c in stat_cols
+        }
+
+    # 2️⃣ Distinct counts: value_counts serves both n_unique and top-k for non-numeric columns
+    n_unique = df[number_cols].nunique().astype(int).to_dict() if number_cols else {}
+    top_values = {}
+    for c in other_cols:
+        counts = df[c].value_counts(dropna=True)
+        n_unique[c] = int(len(counts))
+        top_values[c] = counts.head(top_k).to_dict()
+
+    # 3️⃣ Sample values from the head (avoids dropna() copies of full columns)
+    head = df.head(max(1000, n_samples))
+    samples = {}
+    for c in df.columns:
+        vals = head[c].dropna()
+        if len(vals) < n_samples and len(head) < len(df):
+            vals = df[c].dropna()
+        samples[c] = vals.head(n_samples).astype(str).tolist()
+
+    # 4️⃣ Correlation matrix (computed once)
+    corr = df[number_cols].corr().abs() if number_cols else None
+
+    return DatasetProfile(
+        shape=df.shape,
+        dtypes={c: str(df[c].dtype) for c in df.columns},
+        n_missing=n_missing,
+        n_unique={c: n_unique[c] for c in df.columns},
+        numeric_stats=numeric_stats,
+        top_values=top_values,
+        samples=samples,
+        numeric_columns=number_cols,
+        corr=corr,
+    )
+
+
+# --------------------------------------------------
+# Incremental profiling for chunked (constant-memory) ingestion
+# --------------------------------------------------
+class ProfileAccumulator:
+    """
+    Builds a DatasetProfile from DataFrame chunks with bounded memory.
+    - Mean/std: Chan's parallel merge of (count, mean, M2)
+    - Distinct counts: exact below sketch_size, KMV hash-sketch estimate above
+    - Top-k values: merged value counts, capped at max_tracked_values per column
+    - Correlations: listwise-complete rows (pandas .corr() is pairwise, so
+      results differ slightly when numeric columns have missing values)
+    """
+
+    def __init__(self, top_k: int = 5, n_samples: int = 5,
+                 max_tracked_values: int = 10000, sketch_size: int = 4096):
+        self.top_k = top_k
+        self.n_samples = n_samples
+        self.max_tracked_values = max_tracked_values
+        self.sketch_size = sketch_size
+
+        self.columns = None
+        self.n_rows = 0
+        self.dtypes = {}
+        self.n_missing = None
+        self.moments = None          # DataFrame: index=column, cols=count/mean/m2/min/max
+        self.counts = {}             # column -> value counts Series
+        self.capped = set()          # columns whose value counts were truncated
+        self.sketches = {}           # column -> sorted uint64 array of smallest hashes
+        self.samples = {}
+        self.corr_cols = None
+        self.corr_shift = None
+        self.corr_n = 0
+        self.corr_sum = None
+        self.corr_xtx = None
+
+    def add(self, chunk: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(chunk.columns)
+            self.n_missing = pd.Series(0, index=chunk.columns, dtype="int64")
+        self.n_rows += len(chunk)
+        self.n_missing = self.n_missing.add(chunk.isna().sum(), fill_value=0).astype("int64")
+
+        # 1️⃣ dtypes: widen when chunks disagree (int → float, anything else → object)
+        for c in chunk.columns:
+            dtype, prev = chunk[c].dtype, self.dtypes.get(c)
+            if prev is None or prev == dtype:
+                self.dtypes[c] = dtype
+            elif pd.api.types.is_numeric_dtype(prev) and pd.api.types.is_numeric_dtype(dtype):
+                self.dtypes[c] = np.result_type(prev, dtype)
+            else:
+                self.dtypes[c] = np.dtype("object")
+
+        self._add_moments(chunk)
+        self._add_counts(chunk)
+        self._add_sketches(chunk)
+        self._add_samples(chunk)
+        self._add_corr(chunk)
+
+    # ---- per-chunk updates ----
+    def _add_moments(self, chunk):
+        stat_cols = [c for c in chunk.columns if pd.api.types.is_numeric_dtype(chunk[c])]
+        if not stat_cols:
+            return
+        sub = chunk[stat_cols].astype("float64")
+        part = pd.DataFrame({
+            "count": sub.count(),
+            "mean": sub.mean(),
+            "m2": sub.var(ddof=0) * sub.count(),
+            "min": sub.min(),
+            "max": sub.max(),
+        })
+        if self.moments is None:
+            self.moments = part
+            return
+
+        a = self.moments.reindex(self.moments.index.union(part.index))
+        b = part.reindex(a.index)
+        na, nb = a["count"].fillna(0), b["count"].fillna(0)
+        ma, mb = a["mean"].fillna(0), b["mean"].fillna(0)
+        n = na + nb
+        delta = mb - ma
+        safe_n = n.where(n > 0, 1)
+        self.moments = pd.DataFrame({
+            "count": n,
+            "mean": (ma + delta * nb / safe_n).where(n > 0),
+            "m2": a["m2"].fillna(0) + b["m2"].fillna(0) + delta ** 2 * na * nb / safe_n,
+            "min": pd.concat([a["min"], b["min"]], axis=1).min(axis=1),
+            "max": pd.concat([a["max"], b["max"]], axis=1).max(axis=1),
+        })
+
+    def _add_counts(self, chunk):
+        for c in chunk.columns:
+            if is_numeric(chunk[c].dtype):
+                continue
+            vc = chunk[c].value_counts(dropna=True)
+            prev = self.counts.get(c)
+            merged = vc if prev is None else prev.add(vc, fill_value=0)
+            if len(merged) > self.max_tracked_values:
+                merged = merged.nlargest(self.max_tracked_values)
+                self.capped.add(c)
+            self.counts[c] = merged
+
+    def _add_sketches(self, chunk):
+        for c in chunk.columns:
+            s = chunk[c].dropna()
+            if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+                s = s.astype("float64")  # 1 and 1.0 must hash alike across chunks
+            hashes = np.unique(pd.util.hash_pandas_object(s, index=False).to_numpy())
+            prev = self.sketches.get(c)
+            merged = hashes if prev is None else np.union1d(prev, hashes)
+            self.sketches[c] = merged[: self.sketch_size]
+
+    def _add_samples(self, chunk):
+        for c in chunk.columns:
+            have = self.samples.setdefault(c, [])
+            if len(have) < self.n_samples:
+                have.extend(chunk[c].dropna().head(self.n_samples - len(have)).astype(str).tolist())
+
+    def _add_corr(self, chunk):
+        if self.corr_cols is None:
+            self.corr_cols = [c for c in chunk.columns if is_numeric(chunk[c].dtype)]
+        if len(self.corr_cols) < 2:
+            return
+        x = chunk[self.corr_cols].apply(pd.to_numeric, errors="coerce").dropna().to_numpy(dtype="float64")
+        if not len(x):
+            return
+        if self.corr_shift is None:
+            # Shift by the first chunk's means for numerically stable sums
+            self.corr_shift = x.mean(axis=0)
+            self.corr_sum = np.zeros(len(self.corr_cols))
+            self.corr_xtx = np.zeros((len(self.corr_cols), len(self.corr_cols)))
+        xc = x - self.corr_shift
+        self.corr_n += len(xc)
+        self.corr_sum += xc.sum(axis=0)
+        self.corr_xtx += xc.T @ xc
+
+    # ---- final profile ----
+    def _n_unique(self, c):
+        if c in self.counts and c not in self.capped:
+            return int(len(self.counts[c]))
+        sketch = self.sketches.get(c, np.empty(0, dtype="uint64"))
+        if len(sketch) < self.sketch_size:
+            return int(len(sketch))
+        # K-minimum-values estimate: (k - 1) / normalized k-th smallest hash
+        return int((self.sketch_size - 1) / (float(sketch[-1]) / 2.0 ** 64))
+
+    def _corr(self, number_cols):
+        if self.corr_n < 2 or self.corr_cols is None:
+            return None
+        n = self.corr_n
+        cov = (self.corr_xtx - np.outer(self.corr_sum, self.corr_sum) / n) / (n - 1)
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = cov / np.outer(std, std)
+        corr = pd.DataFrame(np.abs(corr), index=self.corr_cols, columns=self.corr_cols)
+        keep = [c for c in self.corr_cols if c in set(number_cols)]
+        return corr.loc[keep, keep]
+
+    def result(self) -> DatasetProfile:
+        columns = self.columns or []
+        number_cols = [c for c in columns if is_numeric(self.dtypes[c])]
+
+        numeric_stats = {}
+        for c in columns:
+            if self.moments is None or c not in self.moments.index:
+                continue
+            if not pd.api.types.is_numeric_dtype(self.dtypes[c]):
+                continue
+            m = self.moments.loc[c]
+            count = m["count"]
+            numeric_stats[c] = {
+                "mean": float(m["mean"]),
+                "std": float(np.sqrt(m["m2"] / (count - 1))) if count > 1 else float("nan"),
+                "min": float(m["min"]),
+                "max": float(m["max"]),
+            }
+
+        top_values = {
+            c: self.counts[c].sort_values(ascending=False, kind="stable").head(self.top_k).astype(int).to_dict()
+            for c in columns if c in self.counts and c not in set(number_cols)
+        }
+
+        corr = self._corr(number_cols)
+        return DatasetProfile(
+            shape=(self.n_rows, len(columns)),
+            dtypes={c: str(self.dtypes[c]) for c in columns},
+            n_missing={c: int(self.n_missing[c]) for c in columns},
+            n_unique={c: self._n_unique(c) for c in columns},
+            numeric_stats=numeric_stats,
+            top_values=top_values,
+            samples={c: self.samples.get(c, []) for c in columns},
+            numeric_columns=number_cols,
+            corr=corr if number_cols else None,
+        )
@@ -0,0 +1,137 @@
+import json
+import math
+import threading
+
+from core.embeddings import _token_counter
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """Tokens in `text` for the chat model (tiktoken; ~4 chars/token when encodings are unavailable)."""
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                _encoder = _token_counter(model)
+                _encoder_loaded = True
+    if _encoder is None:
+        return len(text) // 4 + 1
+    return len(_encoder.encode(text, disallowed_special=()))
+
+
+def compact_json(obj) -> str:
+    """JSON without pretty-printing (indentation alone is ~30% of an indented EDA payload)."""
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _round(value, digits: int = 4):
+    """Round floats to `digits` significant digits; long float reprs are token-heavy and add nothing."""
+    if isinstance(value, float) and math.isfinite(value):
+        return float(f"{value:.{digits}g}")
+    return value
+
+
+def _sample_value(value, max_chars: int = 40):
+    """Sample cell as sent to the model: long text clipped, floats rounded."""
+    if isinstance(value, str):
+        return value[:max_chars]
+    return _round(value)
+
+
+# --------------------------------------------------
+# Column relevance
+# --------------------------------------------------
+def rank_columns(eda_summary: dict, profile=None) -> list:
+    """
+    Column names of the EDA summary, most useful to the planner first:
+    - completeness (1 − missing share)
+    - +1 for measures (numeric, not ID-like) and time axes (datetime dtype / date-like name)
+    - +0.5 for groupable categories (2–50 distinct values)
+    - + strongest |correlation| with another numeric column (when a profile is given)
+    Constant and all-distinct text columns (free text / IDs) rank last.
+    """
+    n_rows = max(int((eda_summary.get("shape") or [0])[0] or 0), 1)
+    corr = profile.corr if profile is not None else None
+    scores = {}
+    for info in eda_summary.get("columns", []):
+        name, dtype = info["name"], str(info.get("dtype", ""))
+        n_unique = int(info.get("n_unique") or 0)
+        score = 1.0 - int(info.get("n_missing") or 0) / n_rows
+        numeric = "int" in dtype.lower() or "float" in dtype.lower()
+        if n_unique <= 1 or (not numeric and n_unique >= n_rows and "datetime" not in dtype):
+            scores[name] = -1.0
+            continue
+        if "datetime" in dtype or "date" in str(name).lower():
+            score += 1.0
+        elif numeric and n_unique < n_rows:
+            score += 1.0
+        elif not numeric and 2 <= n_unique <= 50:
+            score += 0.5
+        if corr is not None and name in corr.columns and len(corr.columns) > 1:
+            others = corr[name].drop(index=name, errors="ignore")
+            if len(others) and others.notna().any():
+                score += float(others.max())
+        scores[name] = score
+    return sorted(scores, key=lambda c: -scores[c])
+
+
+# --------------------------------------------------
+# Budgeted prompt sections
+# --------------------------------------------------
+def fit_plan_context(eda_summary: dict, sample_rows: list, budget_tokens: int, profile=None) -> dict:
+    """
+    Compact EDA, column list and sample rows for the planning prompt, fitted to budget_tokens.
+    Columns are added in rank_columns order until the next one would not fit; each kept
+    column contributes its stats, its name/dtype and its sample values. Omitted columns
+    are only counted, so the planner knows the table is wider.
+    Returns {"eda", "cols", "sample", "tokens", "kept", "omitted"} (strings ready for the prompt).
+    """
+    entries = {info["name"]: info for info in eda_summary.get("columns", [])}
+    ranked = rank_columns(eda_summary, profile)
+
+    kept, used = [], 0
+    for name in ranked:
+        info = {k: _round(v) for k, v in entries[name].items()}
+        # Stats entry + name/dtype entry + one "name": value pair per sample row
+        cost = (
+            count_tokens(compact_json(info))
+            + count_tokens(compact_json({"name": name, "dtype": info.get("dtype")}))
+            + sum(count_tokens(compact_json({name: _sample_value(row.get(name))})) for row in sample_rows)
+        )
+        if kept and used + cost > budget_tokens:
+            break
+        kept.append((name, info))
+        used += cost
+
+    names = [name for name, _ in kept]
+    order = {name: i for i, name in enumerate(entries)}
+    kept.sort(key=lambda item: order[item[0]])   # original column order reads more naturally
+    eda = {"shape": eda_summary.get("shape"), "columns": [info for _, info in kept]}
+    omitted = len(entries) - len(kept)
+    if omitted:
+        eda["omitted_columns"] = omitted
+    sample = [{name: _sample_value(row.get(name)) for name, _ in kept} for row in sample_rows]
+    cols = [{"name": name, "dtype": info.get("dtype")} for name, info in kept]
+
+    sections = {"eda": compact_json(eda), "cols": compact_json(cols), "sample": compact_json(sample)}
+    return {
+        **sections,
+        "tokens": sum(count_tokens(text) for text in sections.values()),
+        "kept": names,
+        "omitted": omitted,
+    }
+
+
+def fit_documents(texts: list, budget_tokens: int) -> str:
+    """Join retrieved documents in relevance order, stopping before budget_tokens is exceeded."""
+    parts, used = [], 0
+    for text in texts:
+        cost = count_tokens(text) + 1
+        if parts and used + cost > budget_tokens:
+            break
+        parts.append(text)
+        used += cost
+    return "\n".join(parts)
@@ -0,0 +1,82 @@
+import os
+import threading
+
+from core.config import (
+    PIPELINE_VERSION,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_MAX_BYTES,
+    FORECAST_CACHE_DIR,
+    FORECAST_CACHE_MAX_BYTES,
+)
+from core.serialization import dumps, loads
+
+
+class ResultCache:
+    """
+    On-disk cache of final JSON results (dashboards, forecasts).
+    - One file per (content hash, pipeline version)
+    - Hits refresh the file mtime, so eviction is least-recently-used
+    - Oldest files are removed once the directory exceeds max_bytes
+    """
+
+    def __init__(self, directory: str, max_bytes: int, version: str):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self._lock = threading.Lock()
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}-v{self.version}.json")
+
+    def get(self, digest: str):
+        path = self._path(digest)
+        try:
+            with open(path, "rb") as f:
+                result = loads(f.read())
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Result cache read failed for {digest[:12]}: {e}")
+            return None
+
+    def put(self, digest: str, result: dict):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(digest)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(dumps(result))
+            os.replace(tmp_path, path)
+            self._evict()
+        except Exception as e:
+            print(f"⚠️ Result cache write failed for {digest[:12]}: {e}")
+
+    def delete(self, digest: str):
+        try:
+            os.remove(self._path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(".json"):
+                    st = entry.stat()
+                    files.append((st.st_mtime, st.st_size, entry.path))
+
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+
+result_cache = ResultCache(RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, PIPELINE_VERSION)
+forecast_cache = ResultCache(FORECAST_CACHE_DIR, FORECAST_CACHE_MAX_BYTES, PIPELINE_VERSION)
@@ -0,0 +1,172 @@
+import hashlib
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Object columns with fewer distinct values than this share of rows become `category`
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+# Share of sampled values that must parse as dates before a text column is converted
+DATE_MIN_PARSE_RATE = 0.95
+DATE_NAME_HINTS = ("date", "time", "day", "month", "year", "ds")
+
+# Date conventions tried in order; day-first only when ISO / inferred formats do not fit
+DATE_CONVENTIONS = ({"format": "ISO8601"}, {}, {"dayfirst": True})
+
+_NULLABLE_INTS = [("Int8", np.int8), ("Int16", np.int16), ("Int32", np.int32), ("Int64", np.int64)]
+
+
+# --------------------------------------------------
+# dtype predicates shared by the pipeline
+# --------------------------------------------------
+def is_numeric(dtype) -> bool:
+    """Numeric (incl. nullable ints / float32) but not bool."""
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def is_categorical(dtype) -> bool:
+    """Text-like grouping column: object, string or category (dtype or dtype string)."""
+    if isinstance(dtype, str):
+        return dtype in ("object", "category", "string", "str")
+    return (
+        pd.api.types.is_object_dtype(dtype)
+        or pd.api.types.is_string_dtype(dtype) and not pd.api.types.is_datetime64_any_dtype(dtype)
+        or isinstance(dtype, pd.CategoricalDtype)
+    )
+
+
+def is_datetime(dtype) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(dtype)
+
+
+def schema_fingerprint(profile) -> str:
+    """Stable hash of the column names + dtypes (identifies recurring files with the same layout)."""
+    schema = "\n".join(f"{c}:{dtype}" for c, dtype in profile.dtypes.items())
+    return hashlib.sha256(schema.encode()).hexdigest()[:16]
+
+
+# --------------------------------------------------
+# Date parsing: the single parser used at load time, by chunk readers and by trends
+# --------------------------------------------------
+def _to_datetime(s: pd.Series, convention: dict) -> pd.Series:
+    if not (pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)):
+        s = s.astype(str)  # categories, numbers (e.g. years); NaN becomes "nan" → NaT
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)  # "could not infer format"
+        return pd.to_datetime(s, errors="coerce", **convention)
+
+
+def date_convention(s: pd.Series, sample_size: int = 500) -> tuple:
+    """
+    (to_datetime kwargs, parse rate) of the first DATE_CONVENTIONS entry that parses
+    DATE_MIN_PARSE_RATE of a sample of `s`, else of the one parsing the most.
+    """
+    sample = s.dropna().head(sample_size)
+    if sample.empty:
+        return DATE_CONVENTIONS[0], 0.0
+    best, best_rate = DATE_CONVENTIONS[0], -1.0
+    for convention in DATE_CONVENTIONS:
+        rate = float(_to_datetime(sample, convention).notna().mean())
+        if rate >= DATE_MIN_PARSE_RATE:
+            return convention, rate
+        if rate > best_rate:
+            best, best_rate = convention, rate
+    return best, best_rate
+
+
+def parse_dates(s: pd.Series, convention: dict = None) -> pd.Series:
+    """Column as datetime64 (unparseable values → NaT); the convention is picked by date_convention unless given."""
+    if is_datetime(s.dtype):
+        return s
+    if convention is None:
+        convention, _ = date_convention(s)
+    return _to_datetime(s, convention)
+
+
+def _looks_like_dates(name: str, s: pd.Series) -> bool:
+    sample = s.dropna().head(500)
+    if sample.empty:
+        return False
+    hinted = any(h in str(name).lower() for h in DATE_NAME_HINTS)
+    if not hinted and sample.astype(str).str.len().mean() < 8:
+        return False  # short codes like "1-2" parse as dates too easily
+    return date_convention(sample)[1] >= DATE_MIN_PARSE_RATE
+
+
+def detect_date_columns(df: pd.DataFrame) -> dict:
+    """Text columns that look like dates → their parse convention (decided on `df`, e.g. a first chunk)."""
+    return {
+        c: date_convention(df[c])[0]
+        for c in df.columns
+        if pd.api.types.is_object_dtype(df[c].dtype) and _looks_like_dates(c, df[c])
+    }
+
+
+def parse_date_columns(df: pd.DataFrame, conventions: dict = None) -> pd.DataFrame:
+    """
+    Convert text columns that look like dates to datetime64 in place (load-time parse).
+    conventions: {column: convention} from detect_date_columns, so every chunk of a
+    file is parsed the same way; detected on `df` when omitted.
+    """
+    if conventions is None:
+        conventions = detect_date_columns(df)
+    for c, convention in conventions.items():
+        if c in df.columns:
+            df[c] = parse_dates(df[c], convention)
+    return df
+
+
+# --------------------------------------------------
+# Load-time schema inference + downcasting
+# --------------------------------------------------
+
+
+def _downcast_float(s: pd.Series) -> pd.Series:
+    values = s.to_numpy(dtype="float64")
+    finite = values[~np.isnan(values)]
+
+    # Integral floats (ints with missing values) → smallest nullable Int
+    if len(finite) and np.all(np.mod(finite, 1) == 0):
+        lo, hi = finite.min(), finite.max()
+        for name, np_type in _NULLABLE_INTS:
+            info = np.iinfo(np_type)
+            if info.min <= lo and hi <= info.max:
+                return s.astype(name)
+
+    # float32 only when every value round-trips exactly; KPI sums and chart values
+    # are reported to the user, so a lossy downcast would change the dashboard
+    with np.errstate(over="ignore"):
+        f32 = values.astype("float32")
+    if np.array_equal(f32.astype("float64"), values, equal_nan=True):
+        return pd.Series(f32, index=s.index, name=s.name)
+    return s
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a freshly parsed DataFrame to compact dtypes, column by column:
+    - text columns that parse as dates → datetime64 (parsed once, here)
+    - low-cardinality text → category
+    - ints → smallest int; integral floats with NaN → nullable Int; floats → float32 when lossless
+    """
+    before = df.memory_usage(deep=True).sum()
+    n_rows = max(len(df), 1)
+
+    for c in df.columns:
+        s = df[c]
+        try:
+            if pd.api.types.is_object_dtype(s.dtype):
+                if _looks_like_dates(c, s):
+                    df[c] = parse_dates(s)
+                elif s.nunique(dropna=True) / n_rows < CATEGORY_MAX_UNIQUE_RATIO:
+                    df[c] = s.astype("category")
+            elif pd.api.types.is_integer_dtype(s.dtype):
+                df[c] = pd.to_numeric(s, downcast="integer")
+            elif pd.api.types.is_float_dtype(s.dtype):
+                df[c] = _downcast_float(s)
+        except Exception as e:
+            print(f"⚠️ dtype optimization skipped for '{c}': {e}")
+
+    after = df.memory_usage(deep=True).sum()
+    print(f"🗜️ Optimized dtypes: {before / 1e6:.1f} MB → {after / 1e6:.1f} MB")
+    return df
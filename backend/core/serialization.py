@@ -0,0 +1,54 @@
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+# NumPy arrays / scalars are encoded natively (no per-element Python walk);
+# NaN and ±inf become null, as JSON has no representation for them
+DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    """Values orjson does not encode natively: pandas scalars / containers, object arrays, sets."""
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return obj.to_numpy()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()      # object / float16 / complex arrays
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)              # Timestamp, Timedelta, Decimal, ...
+
+
+def _plain_keys(obj):
+    """Stringify dict keys orjson rejects (NumPy scalars, Timestamps). Slow path, rarely taken."""
+    if isinstance(obj, dict):
+        return {
+            (k.item() if isinstance(k, np.generic) else k if isinstance(k, (str, int, float, bool)) else str(k)):
+                _plain_keys(v)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, (list, tuple)):
+        return [_plain_keys(v) for v in obj]
+    return obj
+
+
+def dumps(obj) -> bytes:
+    """Encode a payload to JSON bytes (NumPy / pandas aware, NaN → null)."""
+    try:
+        return orjson.dumps(obj, default=_default, option=DUMPS_OPTIONS)
+    except TypeError:
+        return orjson.dumps(_plain_keys(obj), default=_default, option=DUMPS_OPTIONS)
+
+
+loads = orjson.loads
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(): NumPy / pandas values are serialized directly."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
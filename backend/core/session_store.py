@@ -0,0 +1,95 @@
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.config import (
+    DATASET_STORE_MAX_ITEMS,
+    DATASET_STORE_TTL_SECONDS,
+    DATASET_STORE_MAX_BYTES,
+)
+
+
+class DatasetStore:
+    """
+    Server-side store of parsed DataFrames keyed by dataset ID.
+    Large uploads processed in constant-memory mode are stored as their
+    SpooledUpload instead and read on demand.
+    - LRU order: every get() marks the entry as most recently used
+    - TTL: entries idle for longer than ttl_seconds are dropped
+    - Memory budget: least recently used entries are evicted once the
+      total DataFrame footprint exceeds max_bytes (the newest entry is
+      always kept, even if it alone is over budget)
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: int, max_bytes: int):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # dataset_id -> {"df", "nbytes", "last_access"}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, df, dataset_id: str = None) -> str:
+        """Register a DataFrame (or SpooledUpload) and return its dataset ID."""
+        dataset_id = dataset_id or uuid.uuid4().hex
+        if isinstance(df, pd.DataFrame):
+            nbytes = int(df.memory_usage(deep=True).sum())
+        else:
+            nbytes = int(getattr(df, "memory_bytes", 0))
+
+        with self._lock:
+            self._remove(dataset_id)
+            self._entries[dataset_id] = {"df": df, "nbytes": nbytes, "last_access": time.monotonic()}
+            self._total_bytes += nbytes
+            self._evict()
+
+        return dataset_id
+
+    def get(self, dataset_id: str):
+        """Return the stored DataFrame (or SpooledUpload), or None if unknown or expired."""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None:
+                return None
+            if time.monotonic() - entry["last_access"] > self.ttl_seconds:
+                self._remove(dataset_id)
+                return None
+            entry["last_access"] = time.monotonic()
+            self._entries.move_to_end(dataset_id)
+            return entry["df"]
+
+    def drop(self, dataset_id: str):
+        with self._lock:
+            self._remove(dataset_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"datasets": len(self._entries), "bytes": self._total_bytes}
+
+    # ---- internal helpers (caller holds the lock) ----
+    def _remove(self, dataset_id: str):
+        entry = self._entries.pop(dataset_id, None)
+        if entry is not None:
+            self._total_bytes -= entry["nbytes"]
+
+    def _evict(self):
+        now = time.monotonic()
+        for dataset_id in [k for k, v in self._entries.items() if now - v["last_access"] > self.ttl_seconds]:
+            self._remove(dataset_id)
+
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_items or self._total_bytes > self.max_bytes
+        ):
+            oldest_id = next(iter(self._entries))
+            print(f"🧹 Evicting dataset {oldest_id} from session store")
+            self._remove(oldest_id)
+
+
+dataset_store = DatasetStore(
+    max_items=DATASET_STORE_MAX_ITEMS,
+    ttl_seconds=DATASET_STORE_TTL_SECONDS,
+    max_bytes=DATASET_STORE_MAX_BYTES,
+)
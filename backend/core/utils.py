@@ -1,21 +1,20 @@
 import pandas as pd
 import json
+from core.profiling import profile_dataframe
 
-def dataframe_summary(df: pd.DataFrame) -> dict:
-    summary = {"shape": df.shape, "columns": []}
+def dataframe_summary(df: pd.DataFrame, profile=None) -> dict:
+    profile = profile or profile_dataframe(df)
+    summary = {"shape": profile.shape, "columns": []}
     for c in df.columns:
         info = {
             "name": c,
-            "dtype": str(df[c].dtype),
-            "n_missing": int(df[c].isna().sum()),
-            "n_unique": int(df[c].nunique())
+            "dtype": profile.dtypes[c],
+            "n_missing": profile.n_missing[c],
+            "n_unique": profile.n_unique[c]
         }
 
-        if pd.api.types.is_numeric_dtype(df[c]):
-            info["mean"] = float(df[c].mean(skipna=True))
-            info["std"] = float(df[c].std(skipna=True))
-            info["min"] = float(df[c].min(skipna=True))
-            info["max"] = float(df[c].max(skipna=True))
+        if c in profile.numeric_stats:
+            info.update(profile.numeric_stats[c])
 
         summary["columns"].append(info)
     return summary
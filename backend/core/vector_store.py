@@ -0,0 +1,96 @@
+import json
+import os
+
+import numpy as np
+from langchain.schema import Document
+from langchain_core.vectorstores import VectorStore
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact brute-force cosine retriever over an in-memory matrix.
+    For the few hundred column documents of a typical dataset a single
+    matrix-vector product beats building and querying a FAISS index.
+    """
+
+    def __init__(self, embedding, vectors=None, documents=None):
+        self.embedding = embedding
+        self.vectors = vectors if vectors is not None else np.empty((0, 0), dtype="float32")
+        self.documents = documents or []
+
+    @property
+    def embeddings(self):
+        return self.embedding
+
+    # ---- building ----
+    def _append(self, texts, metadatas, vectors):
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = _normalize(np.asarray(vectors, dtype="float32"))
+        self.vectors = vectors if not len(self.documents) else np.vstack([self.vectors, vectors])
+        self.documents.extend(Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas))
+        return [str(i) for i in range(len(self.documents) - len(texts), len(self.documents))]
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        return self._append(texts, metadatas, self.embedding.embed_documents(texts))
+
+    async def aadd_texts(self, texts, metadatas=None, **kwargs):
+        texts = list(texts)
+        return self._append(texts, metadatas, await self.embedding.aembed_documents(texts))
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding)
+        store.add_texts(texts, metadatas)
+        return store
+
+    @classmethod
+    async def afrom_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        store = cls(embedding)
+        await store.aadd_texts(texts, metadatas)
+        return store
+
+    # ---- search ----
+    def _top_k(self, query_vector, k):
+        if not len(self.documents):
+            return []
+        scores = self.vectors @ _normalize(np.asarray(query_vector, dtype="float32"))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.documents[i], float(scores[i])) for i in top]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self._top_k(self.embedding.embed_query(query), k)
+
+    async def asimilarity_search_with_score(self, query, k=4, **kwargs):
+        return self._top_k(await self.embedding.aembed_query(query), k)
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    # ---- persistence (same folder layout contract as FAISS.save_local / load_local) ----
+    def save_local(self, folder_path: str):
+        os.makedirs(folder_path, exist_ok=True)
+        np.save(os.path.join(folder_path, "vectors.npy"), self.vectors)
+        with open(os.path.join(folder_path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump([{"page_content": d.page_content, "metadata": d.metadata} for d in self.documents], f)
+
+    @classmethod
+    def load_local(cls, folder_path: str, embedding):
+        vectors = np.load(os.path.join(folder_path, "vectors.npy"))
+        with open(os.path.join(folder_path, "documents.json"), encoding="utf-8") as f:
+            documents = [Document(**d) for d in json.load(f)]
+        return cls(embedding, vectors, documents)
+
+    @staticmethod
+    def exists(folder_path: str) -> bool:
+        return os.path.exists(os.path.join(folder_path, "vectors.npy"))
+
+
+def _normalize(x):
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.where(norms == 0, 1, norms)
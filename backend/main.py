@@ -1,40 +1,80 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import io
-import json
-import pandas as pd
-import numpy as np
-import math
+from fastapi.responses import StreamingResponse
+import asyncio
+import importlib
+from contextlib import asynccontextmanager
+from typing import Optional
 
 from services.eda_service import get_eda_summary
 
-from services.ai_agent import run_ai_agent
-from services.insights_service import refine_insights_with_rag
-from models.responses import DashboardResponse
+from services.ai_agent import plan_dashboard
+from services.dashboard_engine import compute_plan_outputs, compute_plan_outputs_chunked
+from services.insights_service import iter_refined_insights
 from services.trends_service import generate_trends_with_ai
 
-from services.rag_service import build_rag_index
+from services.rag_service import build_rag_index, attach_domain_description
+from core.session_store import dataset_store
+from core.result_cache import result_cache
+from core.ingest import spool_upload, load_dataframe, profile_csv_chunks, read_with_dates, SpooledUpload
+from core.executor import run_blocking, get_process_pool, shutdown_process_pool
+from core.config import INSIGHT_MAX_TOPICS, CHART_MAX_POINTS_LIMIT, WARMUP_ON_STARTUP
+from core.profiling import profile_dataframe
+from core.serialization import ORJSONResponse, dumps
+from core.llm_gateway import llm_gateway
+from core.clients import clients
+from core.prompt_budget import count_tokens
+
+
 # --------------------------------------------------
-# Helper: convert NumPy + pandas objects to Python
+# Helpers: client-requested chart point budget
 # --------------------------------------------------
-def to_python(obj):
-    """Recursively convert numpy and pandas objects to native Python types."""
-    if isinstance(obj, (np.generic,)):
-        return obj.item()
-    if isinstance(obj, (pd.Timestamp, pd.Timedelta)):
-        return str(obj)
-    if isinstance(obj, (list, tuple, set)):
-        return [to_python(x) for x in obj]
-    if isinstance(obj, dict):
-        return {k: to_python(v) for k, v in obj.items()}
-    return obj
+def _point_budget(max_points: Optional[int]):
+    """Client-requested chart point count, clamped to CHART_MAX_POINTS_LIMIT (None → server default)."""
+    if not max_points or max_points <= 0:
+        return None
+    return max(4, min(max_points, CHART_MAX_POINTS_LIMIT))
+
+
+def _result_key(dataset_id: str, max_points: Optional[int]) -> str:
+    """Result cache key: payloads downsampled to a custom point count are cached separately."""
+    return dataset_id if max_points is None else f"{dataset_id}-p{max_points}"
+
+
+# --------------------------------------------------
+# Startup / shutdown
+# --------------------------------------------------
+def _warm_up():
+    """Pay one-time costs before the first request: heavy imports, clients, tokenizer, process pool."""
+    steps = {
+        "prophet": lambda: importlib.import_module("prophet"),
+        "chat model": clients.chat_model,
+        "tokenizer": lambda: count_tokens("warm-up"),
+        "process pool": get_process_pool,
+    }
+    for name, step in steps.items():
+        try:
+            step()
+        except Exception as e:
+            print(f"⚠️ Warm-up step '{name}' failed: {e}")
+    print("🔥 Warm-up finished")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve immediately; warm-up (opt-in) runs in the worker pool alongside the first requests
+    warm_up = asyncio.ensure_future(run_blocking(_warm_up)) if WARMUP_ON_STARTUP else None
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+    await clients.aclose()
+    shutdown_process_pool()
 
 
 # --------------------------------------------------
 # FastAPI setup
 # --------------------------------------------------
-app = FastAPI(title="AI Dashboard Generator API")
+app = FastAPI(title="AI Dashboard Generator API", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -48,168 +88,192 @@ app.add_middleware(
 # --------------------------------------------------
 # Upload route
 # --------------------------------------------------
-@app.post("/upload")
-async def upload_file(file: UploadFile = File(...)):
-    # 1️⃣ Load CSV
-    df = pd.read_csv(io.BytesIO(await file.read()))
+def _register_dataset(upload: SpooledUpload, dataset_id: str):
+    """Parse an upload into the session store (used after a cache hit, off the response path)."""
+    if dataset_store.get(dataset_id) is None:
+        dataset_store.put(upload if upload.is_large else load_dataframe(upload), dataset_id=dataset_id)
+
+
+async def _dashboard_events(upload: SpooledUpload, dataset_id: str, max_points: Optional[int] = None):
+    """
+    Run the dashboard pipeline, yielding (event, payload) as each stage is ready:
+    eda → plan (industry, KPIs, charts, insights) → one "insight" per refined topic → result.
+    Large uploads run in constant-memory mode: `df` is only a head sample and
+    KPI/chart values are aggregated over CSV chunks.
+    max_points: target point count for line charts (None → LINE_CHART_MAX_POINTS).
+    """
+    chunked = upload.is_large
+
+    # 1️⃣–2️⃣ Load CSV + profile columns once (shared by EDA, RAG docs and the agent prompt)
+    if chunked:
+        profile, df = await run_blocking(profile_csv_chunks, upload)
+        dataset_store.put(upload, dataset_id=dataset_id)
+    else:
+        df = await run_blocking(load_dataframe, upload)
+        await run_blocking(dataset_store.put, df, dataset_id=dataset_id)
+        profile = await run_blocking(profile_dataframe, df)
+    eda = get_eda_summary(df, profile)
+    yield "eda", {"eda": eda}
+
+    # 3️⃣ Build RAG index in the background while the AI agent plans the dashboard
+    store_task = asyncio.create_task(build_rag_index(df, profile, dataset_id))
+    try:
+        plan = await plan_dashboard(eda, df, profile) or {}
+        if chunked:
+            plan = await run_blocking(compute_plan_outputs_chunked, upload, plan, profile, max_points)
+        else:
+            plan = await run_blocking(compute_plan_outputs, df, plan, profile, max_points)
+        plan.setdefault("industry", "Unknown")
+        plan.setdefault("kpis", [])
+        plan.setdefault("charts", [])
+        plan.setdefault("insights", [])
+        plan["dataset_id"] = dataset_id
+        yield "plan", plan
+
+        # 6️⃣ Refine insights using RAG, emitting each one as it completes
+        store = await store_task
+        store = await attach_domain_description(store, profile, plan.get("domain_description"), dataset_id)
+        topics = plan.get("insights_flat", [])[:INSIGHT_MAX_TOPICS]
+        detailed_insights = list(topics)
+        fallbacks = 0
+        async for index, text, refined in iter_refined_insights(topics, store):
+            detailed_insights[index] = text
+            fallbacks += not refined
+            yield "insight", {"index": index, "topic": topics[index], "text": text}
+        print("detailed insights",detailed_insights)
+    finally:
+        store_task.cancel()
 
-    # 2️⃣ Generate EDA + build RAG index
-    eda = get_eda_summary(df)
-    store = build_rag_index(df)
+    # 7️⃣ Assemble final response
+    plan["detailed_insights"] = detailed_insights
 
-    # 3️⃣ Ask the AI agent for dashboard plan
-    plan = run_ai_agent(eda, df)
+    print(f"✅ Final response: {len(plan['kpis'])} KPIs, {len(plan['charts'])} charts, "
+          f"{len(detailed_insights)} insights")
+    # Degraded results (LLM outage / empty plan) are served but not cached, so the next upload retries
+    if fallbacks or not (plan["kpis"] or plan["charts"]):
+        print(f"⚠️ Not caching result for {dataset_id[:12]}: {fallbacks} insight fallback(s), "
+              f"{len(plan['kpis'])} KPIs, {len(plan['charts'])} charts")
+    else:
+        await run_blocking(result_cache.put, _result_key(dataset_id, max_points), plan)
+    yield "result", plan
 
-    
 
-    # 4️⃣ Compute KPI values
-    formatted_kpis = []
-    for k in plan.get("kpis", []):
-        cols = k.get("related_columns", []) or k.get("columns", [])
-        value = "N/A"
+@app.post("/upload")
+async def upload_file(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                      max_points: Optional[int] = Form(None)):
+    upload = await spool_upload(file)
+    max_points = _point_budget(max_points)
 
-        try:
-            # single numeric column → sum
-            if len(cols) == 1 and cols[0] in df.columns:
-                col = df[cols[0]]
-                if pd.api.types.is_numeric_dtype(col):
-                    value = round(col.sum(), 2)
-
-            # two numeric columns → ratio
-            elif len(cols) == 2 and all(c in df.columns for c in cols):
-                num, denom = cols[0], cols[1]
-                if pd.api.types.is_numeric_dtype(df[num]) and pd.api.types.is_numeric_dtype(df[denom]):
-                    ratio = df[num].sum() / max(df[denom].sum(), 1)
-                    value = round(ratio, 2)
-
-            # categorical column → unique count
-            elif len(cols) == 1 and not pd.api.types.is_numeric_dtype(df[cols[0]]):
-                value = df[cols[0]].nunique()
+    # 0️⃣ Identical file already processed → return cached dashboard
+    dataset_id = upload.digest
+    cached = await run_blocking(result_cache.get, _result_key(dataset_id, max_points))
+    if cached is not None:
+        print(f"⚡ Result cache hit for {dataset_id[:12]}")
+        background_tasks.add_task(_register_dataset, upload, dataset_id)
+        cached["dataset_id"] = dataset_id
+        return ORJSONResponse(content=cached)
 
-        except Exception as e:
-            print(f"KPI calc error for {k.get('name')}: {e}")
+    plan = {}
+    async for event, payload in _dashboard_events(upload, dataset_id, max_points):
+        if event == "result":
+            plan = payload
 
-        formatted_kpis.append({
-            "name": k.get("name"),
-            "description": k.get("description"),
-            "value": to_python(value)
-        })
+    # 8️⃣ NumPy / pandas values and NaN are handled by the response encoder
+    return ORJSONResponse(content=plan)
 
-    # 5️⃣ Compute chart data
-    formatted_charts = []
-    for c in plan.get("charts", []):
-        chart_type = (c.get("type") or "").lower()
-        cols = c.get("columns", [])
-        data = {"labels": [], "series": []}
 
-        try:
-            # ---- Time-series / line ----
-            if chart_type in ["line", "timeseries"]:
-                date_col = next((col for col in cols if "date" in col.lower()), None)
-                num_col = next((col for col in cols if pd.api.types.is_numeric_dtype(df[col])), None)
-                if date_col and num_col:
-                    temp = df.copy()
-                    temp[date_col] = pd.to_datetime(temp[date_col], errors="coerce")
-                    temp = temp.groupby(date_col)[num_col].sum().reset_index().sort_values(by=date_col)
-                    data = {
-                        "labels": [to_python(x) for x in temp[date_col].dt.strftime("%Y-%m-%d").tolist()],
-                        "series": [{"name": num_col, "values": [to_python(v) for v in temp[num_col].round(2).tolist()]}]
-                    }
-
-            # ---- Bar ----
-            elif chart_type == "bar":
-                cat_col = next((col for col in cols if df[col].dtype == "object"), None)
-                num_col = next((col for col in cols if pd.api.types.is_numeric_dtype(df[col])), None)
-                if cat_col and num_col:
-                    temp = df.groupby(cat_col)[num_col].sum().nlargest(10).reset_index()
-                    data = {
-                        "labels": [to_python(v) for v in temp[cat_col].astype(str).tolist()],
-                        "series": [{"name": num_col, "values": [to_python(v) for v in temp[num_col].round(2).tolist()]}]
-                    }
-
-            # ---- Pie ----
-            elif chart_type == "pie":
-                cat_col = next((col for col in cols if df[col].dtype == "object"), None)
-                num_col = next((col for col in cols if pd.api.types.is_numeric_dtype(df[col])), None)
-                if cat_col and num_col:
-                    temp = df.groupby(cat_col)[num_col].sum().nlargest(6).reset_index()
-                    data = {
-                        "labels": [to_python(v) for v in temp[cat_col].astype(str).tolist()],
-                        "series": [{"name": num_col, "values": [to_python(v) for v in temp[num_col].round(2).tolist()]}]
-                    }
+# --------------------------------------------------
+# Streaming upload route (NDJSON, one event per line)
+# --------------------------------------------------
+@app.post("/upload/stream")
+async def upload_file_stream(background_tasks: BackgroundTasks, file: UploadFile = File(...),
+                             max_points: Optional[int] = Form(None)):
+    upload = await spool_upload(file)
+    dataset_id = upload.digest
+    max_points = _point_budget(max_points)
+
+    def _line(event, payload):
+        return dumps({"event": event, **payload}) + b"\n"
+
+    async def _events():
+        yield _line("dataset", {"dataset_id": dataset_id})
+
+        cached = await run_blocking(result_cache.get, _result_key(dataset_id, max_points))
+        if cached is not None:
+            print(f"⚡ Result cache hit for {dataset_id[:12]}")
+            background_tasks.add_task(_register_dataset, upload, dataset_id)
+            cached["dataset_id"] = dataset_id
+            yield _line("plan", cached)
+            yield _line("result", cached)
+            return
 
+        try:
+            async for event, payload in _dashboard_events(upload, dataset_id, max_points):
+                yield _line(event, payload)
         except Exception as e:
-            print(f"Chart data error for {c.get('title')}: {e}")
-
-        formatted_charts.append({
-            "title": c.get("title"),
-            "type": chart_type,
-            "data": data
-        })
-
-    # 6️⃣ Refine insights using RAG
-    # refined = refine_insights_with_rag(plan.get("insights_flat", []), store, eda)
-
-    detailed_insights = refine_insights_with_rag(
-        plan.get("insights_flat", []),
-        store,
-        eda
-    )
-    print("detailed insights",detailed_insights)
-
-    # 7️⃣ Assemble final response
-    response = DashboardResponse(
-        kpis=formatted_kpis,
-        charts=formatted_charts,
-        insights=detailed_insights,
-        industry=plan.get("industry", "Unknown"),
-        eda=eda
-    )
-
-    plan = plan or {}
-    plan.setdefault("industry", "Unknown")
-    plan.setdefault("kpis", [])
-    plan.setdefault("charts", [])
-    plan.setdefault("insights", [])
-
-    print("✅ FINAL RESPONSE SENT TO FRONTEND:")
-    print(json.dumps(plan, indent=2))
-
-    def sanitize_for_json(obj):
-        if isinstance(obj, dict):
-            return {k: sanitize_for_json(v) for k, v in obj.items()}
-        elif isinstance(obj, list):
-            return [sanitize_for_json(v) for v in obj]
-        elif isinstance(obj, float):
-            if math.isnan(obj) or math.isinf(obj):
-                return None  # or 0 if that makes more sense for your KPIs
-            return obj
-        else:
-            return obj
-
-    plan = sanitize_for_json(plan)
+            print("⚠️ Streaming upload failed:", e)
+            yield _line("error", {"error": f"Dashboard generation failed: {e}"})
 
-    # 8️⃣ Convert to plain JSON-safe structure before returning
-    return JSONResponse(content=plan, media_type="application/json")
+    return StreamingResponse(_events(), media_type="application/x-ndjson")
 
 
 # --------------------------------------------------
 # Trends generation route (triggered manually)
 # --------------------------------------------------
 @app.post("/trends")
-async def generate_trends(file: UploadFile = File(...)):
+async def generate_trends(
+    dataset_id: Optional[str] = Form(None),
+    file: Optional[UploadFile] = File(None),
+    freq: Optional[str] = Form(None),
+    fast: bool = Form(False),
+    targets: Optional[str] = Form(None),
+    segment_by: Optional[str] = Form(None),
+    max_points: Optional[int] = Form(None),
+):
     try:
-        # Load dataset from uploaded CSV
-        df = pd.read_csv(io.BytesIO(await file.read()))
+        # Reuse the DataFrame parsed by /upload; fall back to a re-upload
+        data = dataset_store.get(dataset_id) if dataset_id else None
+        if data is None:
+            if file is None:
+                return ORJSONResponse(
+                    content={"error": f"Dataset '{dataset_id}' not found or expired. Please re-upload the file."},
+                    status_code=404
+                )
+            upload = await spool_upload(file)
+            data = upload if upload.is_large else await run_blocking(load_dataframe, upload)
+            dataset_id = await run_blocking(dataset_store.put, data, dataset_id=upload.digest)
         print("📈 Generating trends...")
+        # Comma-separated target columns and an optional segment column → one forecast per series
+        options = {
+            "freq": freq,
+            "fast": fast,
+            "targets": [t.strip() for t in targets.split(",")] if targets else None,
+            "segment_by": segment_by or None,
+            "max_points": _point_budget(max_points),
+        }
+
+        if isinstance(data, SpooledUpload):
+            # Constant-memory dataset: detect columns on a head sample, then load only ds/y
+            sample = await run_blocking(read_with_dates, data, nrows=1000)
+            trends = await generate_trends_with_ai(
+                sample, load_columns=lambda cols: read_with_dates(data, usecols=cols), **options
+            )
+        else:
+            trends = await generate_trends_with_ai(data, **options)
 
-        trends = generate_trends_with_ai(df)
-
-        return JSONResponse(content=to_python({"trends": trends}), media_type="application/json")
+        return ORJSONResponse(content={"trends": trends, "dataset_id": dataset_id})
 
     except Exception as e:
         print("⚠️ Trend generation failed:", e)
-        return JSONResponse(
+        return ORJSONResponse(
             content={"error": f"Trend generation failed: {str(e)}"},
             status_code=500
         )
+
+
+# --------------------------------------------------
+# LLM gateway metrics (calls, cache hits, coalesced waits, tokens, latency)
+# --------------------------------------------------
+@app.get("/metrics/llm")
+async def llm_metrics():
+    return llm_gateway.metrics()
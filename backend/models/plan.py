@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Union
+
+from pydantic import BaseModel, ConfigDict, ValidationError, field_validator
+
+
+class KPIDefinition(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    name: str
+    description: str = ""
+    related_columns: List[str] = []
+    aggregation: str = "sum"
+
+    @field_validator("aggregation", mode="before")
+    @classmethod
+    def _lower(cls, v):
+        return str(v or "sum").strip().lower()
+
+
+class ChartDefinition(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    title: str = "Untitled Chart"
+    type: str = "bar"
+    columns: List[str] = []
+
+
+def _valid_items(model, items):
+    """Keep the items that validate; one malformed KPI / chart should not sink the plan."""
+    if not isinstance(items, list):
+        return []
+    valid = []
+    for item in items:
+        try:
+            valid.append(model.model_validate(item))
+        except ValidationError as e:
+            print(f"⚠️ Dropping invalid {model.__name__}: {e.errors()[0]['msg']}")
+    return valid
+
+
+class DashboardPlan(BaseModel):
+    """Dashboard plan returned by the agent (definitions only; values are computed later)."""
+    model_config = ConfigDict(extra="ignore")
+
+    industry: str = "Unknown"
+    domain_description: str = ""
+    kpis: List[KPIDefinition] = []
+    charts: List[ChartDefinition] = []
+    insights: Union[Dict[str, List[str]], List[str]] = {}
+
+    @field_validator("industry", "domain_description", mode="before")
+    @classmethod
+    def _text(cls, v, info):
+        if v is None:
+            return cls.model_fields[info.field_name].default
+        return str(v)
+
+    @field_validator("kpis", mode="before")
+    @classmethod
+    def _kpis(cls, v):
+        return _valid_items(KPIDefinition, v)
+
+    @field_validator("charts", mode="before")
+    @classmethod
+    def _charts(cls, v):
+        return _valid_items(ChartDefinition, v)
+
+    @field_validator("insights", mode="before")
+    @classmethod
+    def _insights(cls, v: Any):
+        if isinstance(v, dict):
+            return {str(k): [str(p) for p in (pts if isinstance(pts, list) else [pts])] for k, pts in v.items()}
+        if isinstance(v, list):
+            return [str(p) for p in v]
+        return {}
+
+    def insight_points(self) -> List[str]:
+        """Grouped insight points flattened into seeds for RAG refinement."""
+        if isinstance(self.insights, dict):
+            return [p for points in self.insights.values() for p in points]
+        return list(self.insights)
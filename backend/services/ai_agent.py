@@ -1,23 +1,40 @@
-import json
-import re
-import numpy as np
-import pandas as pd
-from core.config import llm
-from core.utils import to_json_str
+from core.llm_gateway import llm_gateway
+from core.json_repair import parse_json_lenient
+from models.plan import DashboardPlan
+from core.config import PROMPT_EDA_MAX_TOKENS
+from core.prompt_budget import fit_plan_context
+from core.executor import run_blocking
+from core.profiling import profile_dataframe
+from services.dashboard_engine import compute_plan_outputs
 from langchain.prompts import ChatPromptTemplate
 
 
-def run_ai_agent(eda_summary, df):
+async def run_ai_agent(eda_summary, df, profile=None, max_points=None):
     """
     Memory-optimized AI Agent
     - Uses minimal sample (3 rows)
     - Returns KPIs with 'aggregation' instead of type
     - Automatically computes KPI values
+    - Line charts are downsampled to max_points
     """
+    if profile is None:
+        profile = await run_blocking(profile_dataframe, df)
+    parsed = await plan_dashboard(eda_summary, df, profile)
+    return await run_blocking(compute_plan_outputs, df, parsed, profile, max_points)
 
-    # ✅ 1️⃣ Prepare compact dataset summary
+
+async def plan_dashboard(eda_summary, df, profile=None):
+    """
+    Ask the LLM for the dashboard plan (industry, KPI/chart definitions, insights)
+    without computing any values. `df` only needs the first rows, so chunked
+    uploads can pass a head sample.
+    """
+
+    # ✅ 1️⃣ Prepare compact dataset summary: most relevant columns first, within the token budget
     sample_data = df.head(3).to_dict(orient="records")
-    column_summary = [{"name": c, "dtype": str(df[c].dtype)} for c in df.columns]
+    context = fit_plan_context(eda_summary, sample_data, PROMPT_EDA_MAX_TOKENS, profile)
+    print(f"✂️ Plan prompt context: {context['tokens']} tokens, "
+          f"{len(context['kept'])} columns kept, {context['omitted']} omitted")
 
     # ✅ 2️⃣ Define the AI prompt
     prompt = ChatPromptTemplate.from_template("""
@@ -36,6 +53,7 @@ def run_ai_agent(eda_summary, df):
         ### Tasks ###
         1. Read the summary, columns, and sample rows, infer the **real-world domain**
             (e.g. retail, logistics, finance, healthcare, HR, marketing, etc.).Identify the dataset's **industry/domain** (e.g., retail, healthcare, finance, etc.)
+           and describe in 1-2 sentences what this dataset seems to represent ("domain_description").
         2. Suggest **insightful and domain-specific** **5–8 KPIs** as JSON objects with:
            - "name": KPI name
            - "description": brief explanation
@@ -49,6 +67,7 @@ def run_ai_agent(eda_summary, df):
         ### Output JSON Format ###
         {{
           "industry": "Retail",
+          "domain_description": "Point-of-sale transactions of a coffee shop chain, one row per item sold.",
           "kpis": [
             {{
               "name": "Total Revenue",
@@ -88,186 +107,25 @@ def run_ai_agent(eda_summary, df):
     """)
 
     # ✅ 3️⃣ Format LLM message
-    messages = prompt.format_messages(
-        eda=to_json_str(eda_summary),
-        cols=to_json_str(column_summary),
-        sample=to_json_str(sample_data),
-    )
+    messages = prompt.format_messages(eda=context["eda"], cols=context["cols"], sample=context["sample"])
 
-    # ✅ 4️⃣ Call LLM
-    res = llm.invoke(messages)
-    raw_text = res.content.strip()
-    print("AI output",raw_text)
+    # ✅ 4️⃣ Call LLM in JSON mode (syntactically valid JSON unless the reply is cut off)
+    raw_reply = await llm_gateway.complete(messages, response_format={"type": "json_object"})
+    print("AI output", raw_reply.strip())
 
-    # ✅ 5️⃣ Clean raw JSON output
-    raw_text = re.sub(r"^```[a-zA-Z]*", "", raw_text)
-    raw_text = raw_text.replace("```", "").strip()
-    match = re.search(r"\{.*\}", raw_text, re.DOTALL)
-    if match:
-        raw_text = match.group(0)
-
-    # ✅ 6️⃣ Safe JSON parsing
+    # ✅ 5️⃣ Parse locally: tolerant repair instead of a second "fix this JSON" call
     try:
-        parsed = json.loads(raw_text)
-    except Exception:
-        print("⚠️ Invalid JSON — trying to auto-repair...")
-        fix_prompt = f"""
-        The following text was invalid JSON.
-        Fix and return valid JSON containing keys: industry, kpis, charts, insights.
-        Text:
-        {res.content}
-        """
-        fixed_res = llm.invoke([{"role": "user", "content": fix_prompt}])
-        fixed_text = fixed_res.content.strip()
-        fixed_text = re.sub(r"^```[a-zA-Z]*", "", fixed_text).replace("```", "").strip()
-        match = re.search(r"\{.*\}", fixed_text, re.DOTALL)
-        if match:
-            fixed_text = match.group(0)
-        parsed = json.loads(fixed_text)
-
-    # ✅ 7️⃣ Normalize keys
-    normalized = {k.strip().lower(): v for k, v in parsed.items()}
-    parsed = {
-        "industry": normalized.get("industry", "Unknown"),
-        "kpis": normalized.get("kpis", []),
-        "charts": normalized.get("charts", []),
-        "insights": normalized.get("insights", {}),
-    }
-
-    # ✅ 8️⃣ Compute KPI values based on aggregation
-    def compute_kpi_value(df, kpi):
-        cols = [c for c in kpi.get("related_columns", []) if c in df.columns]
-        agg = kpi.get("aggregation", "sum").lower()
-        if not cols:
-            return None
-
-        try:
-            numeric_cols = [c for c in cols if np.issubdtype(df[c].dtype, np.number)]
-            cat_cols = [c for c in cols if df[c].dtype == "object"]
-
-            # If grouping columns exist → top 10 groups
-            if cat_cols and numeric_cols:
-                grouped = df.groupby(cat_cols)[numeric_cols].agg(agg).head(10).reset_index()
-                return grouped.to_dict(orient="records")
-
-            # Multiple numeric columns → product then aggregate
-            if len(numeric_cols) >= 2:
-                result = np.prod([df[c] for c in numeric_cols], axis=0)
-                if agg == "mean":
-                    return float(np.mean(result))
-                if agg == "max":
-                    return float(np.max(result))
-                if agg == "min":
-                    return float(np.min(result))
-                if agg == "count":
-                    return int(np.count_nonzero(result))
-                return float(np.sum(result))
-
-            # Single numeric column
-            if len(numeric_cols) == 1:
-                col = numeric_cols[0]
-                if agg == "mean":
-                    return float(df[col].mean())
-                if agg == "max":
-                    return float(df[col].max())
-                if agg == "min":
-                    return float(df[col].min())
-                if agg == "count":
-                    return int(df[col].count())
-                if agg == "unique":
-                    return int(df[col].nunique())
-                return float(df[col].sum())
-
-            # Single categorical column → unique counts
-            if len(cat_cols) == 1 and agg == "unique":
-                return df[cat_cols[0]].value_counts().head(10).to_dict()
-
-        except Exception as e:
-            print(f"⚠️ KPI calc failed for {kpi.get('name', '')}: {e}")
-            return None
-
-        # ---- Compute KPI values for all ----
-    computed_kpis = []
-    for kpi in parsed["kpis"]:
-        value = compute_kpi_value(df, kpi)
-        kpi_with_value = {**kpi, "value": value}
-        computed_kpis.append(kpi_with_value)
-    parsed["kpis"] = computed_kpis
+        data = parse_json_lenient(raw_reply)
+    except ValueError:
+        # Don't serve the unusable reply from the LLM cache on the next upload
+        await llm_gateway.forget(messages, response_format={"type": "json_object"})
+        raise
+    if isinstance(data, list):
+        data = data[0] if data and isinstance(data[0], dict) else {}
+
+    # ✅ 6️⃣ Validate against the plan model (keys normalized, malformed KPIs / charts dropped)
+    plan = DashboardPlan.model_validate({str(k).strip().lower(): v for k, v in data.items()})
+    parsed = plan.model_dump()
+    parsed["insights_flat"] = plan.insight_points()
 
-    # ✅ Generate simple chart-ready data based on existing KPIs and dataset
-    # ✅ Generate chart-ready data from AI-defined columns
-    parsed_charts = []
-
-    for chart_def in parsed.get("charts", []):
-        try:
-            cols = chart_def.get("columns", [])
-            title = chart_def.get("title", "Untitled Chart")
-            chart_type = chart_def.get("type", "bar")
-
-            if not cols or len(cols) < 2:
-                continue
-
-            # Identify categorical and numeric columns based on AI suggestion
-            cat_cols = [c for c in cols if c in df.columns and df[c].dtype == "object"]
-            num_cols = [c for c in cols if c in df.columns and np.issubdtype(df[c].dtype, np.number)]
-            date_cols = [c for c in cols if "date" in c.lower() and c in df.columns]
-
-            # --- CASE 1: Time series ---
-            if date_cols and num_cols:
-                date_col = date_cols[0]
-                num_col = num_cols[-1]
-                df_temp = df[[date_col, num_col]].copy()
-                df_temp[date_col] = pd.to_datetime(df_temp[date_col], errors="coerce")
-                df_temp = df_temp.dropna(subset=[date_col])
-                grouped = df_temp.groupby(date_col)[num_col].sum().reset_index().sort_values(date_col)
-
-                parsed_charts.append({
-                    "title": title,
-                    "type": chart_type,
-                    "data": {
-                        "labels": grouped[date_col].astype(str).tolist()[:30],
-                        "series": [{"name": num_col, "values": grouped[num_col].round(2).tolist()[:30]}],
-                    },
-                })
-                continue
-
-            # --- CASE 2: Category + numeric (Bar or Pie) ---
-            if cat_cols and num_cols:
-                cat_col = cat_cols[0]
-                num_col = num_cols[-1]
-                grouped = df.groupby(cat_col)[num_col].sum().nlargest(10).reset_index()
-
-                parsed_charts.append({
-                    "title": title,
-                    "type": chart_type,
-                    "data": {
-                        "labels": grouped[cat_col].astype(str).tolist(),
-                        "series": [{"name": num_col, "values": grouped[num_col].round(2).tolist()}],
-                    },
-                })
-                continue
-
-            # --- CASE 3: Fallback (two numerics, show correlation line) ---
-            if len(num_cols) >= 2:
-                x, y = num_cols[:2]
-                parsed_charts.append({
-                    "title": title,
-                    "type": "scatter",
-                    "data": {
-                        "labels": df[x].head(30).astype(str).tolist(),
-                        "series": [{"name": y, "values": df[y].head(30).round(2).tolist()}],
-                    },
-                })
-
-        except Exception as e:
-            print(f"⚠️ Chart generation failed for {chart_def.get('title', '')}: {e}")
-
-    parsed["charts"] = parsed_charts
-    print(f"✅ Generated {len(parsed_charts)} charts from AI definitions.")
-
-
-    print(f"✅ Generated {len(parsed_charts)} charts.")
     return parsed
-
-
-    
@@ -0,0 +1,408 @@
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from core.config import CHART_DOWNSAMPLE_METHOD, LINE_CHART_MAX_POINTS, TIME_SERIES_MAX_GROUPS
+from core.downsampling import downsample_indices
+from core.ingest import chunk_dtypes, iter_chunks_with_dates
+from core.schema import date_convention, is_categorical, is_datetime, parse_dates
+
+# How partial aggregates of each chunk combine into the running total
+MERGE_OPS = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+SCATTER_POINTS = 30
+
+
+# --------------------------------------------------
+# Sources: mergeable partial aggregations, one per distinct scan
+# Each source exposes `key`; KPIs and charts that need the same scan (e.g. every
+# aggregation grouped by product_category) register on a single source.
+# --------------------------------------------------
+def _widen(frame):
+    """Upcast load-time downcast columns so sums cannot overflow int8 / lose float32 precision."""
+    casts = {}
+    for c in frame.columns:
+        dtype = frame[c].dtype
+        if pd.api.types.is_integer_dtype(dtype) and dtype.itemsize < 8:
+            casts[c] = "Int64" if isinstance(dtype, pd.api.extensions.ExtensionDtype) else "int64"
+        elif pd.api.types.is_float_dtype(dtype) and dtype.itemsize < 8:
+            casts[c] = "float64"
+    return frame.astype(casts) if casts else frame
+
+
+class _GroupedSource:
+    """
+    One groupby(keys).agg({col: [ops]}) per chunk, shared by every KPI and chart
+    grouped by the same key columns. Partial sums/counts/min/max merge across chunks.
+    """
+
+    def __init__(self, keys, parse_dates=False):
+        self.keys, self.parse_dates = keys, parse_dates
+        self.key = ("grouped", tuple(keys), parse_dates)
+        self.ops = {}        # value column -> set of partial ops
+        self.limit = 0       # leading groups (in key order) any view reads; None = all
+        self.acc = None
+        self.conventions = {}  # date key -> parse convention, fixed by the first chunk
+
+    def request(self, value_cols, agg, limit=None):
+        if agg not in ("sum", "count", "min", "max", "mean"):
+            raise ValueError(f"aggregation '{agg}' cannot be merged across chunks")
+        for c in value_cols:
+            self.ops.setdefault(c, set()).update(["sum", "count"] if agg == "mean" else [agg])
+        if self.limit is not None:
+            self.limit = None if limit is None else max(self.limit, limit)
+
+    def _by(self, chunk):
+        by = []
+        for k in self.keys:
+            s = chunk[k]
+            if self.parse_dates and not is_datetime(s.dtype):
+                if k not in self.conventions:
+                    self.conventions[k] = date_convention(s)[0]
+                s = parse_dates(s, self.conventions[k])
+            by.append(s)
+        return by
+
+    def _trim(self, acc):
+        # Groups come out sorted by key, so a group beyond the first `limit` can never re-enter them
+        return acc if self.limit is None else acc.iloc[: self.limit]
+
+    def add(self, chunk):
+        spec = {c: sorted(ops) for c, ops in self.ops.items()}
+        part = _widen(chunk[list(spec)]).groupby(self._by(chunk), observed=True).agg(spec)
+        combined = part if self.acc is None else pd.concat([self.acc, part])
+        acc = combined.groupby(level=list(range(len(self.keys))), observed=True).agg(
+            {c: MERGE_OPS[c[1]] for c in combined.columns}
+        )
+        self.acc = self._trim(acc)
+
+
+class _TimeSeriesSource(_GroupedSource):
+    """
+    Grouped partials over one date column, for line charts (every group is read).
+    Distinct timestamps are kept exactly up to max_groups; past that the time axis is
+    floored onto the next coarser grid in GRIDS, so the running total stays bounded on
+    long, fine-grained files. Each grid nests in the next, and the grid reached depends
+    only on the data, so chunked and in-memory runs agree.
+    """
+
+    GRIDS = ["s", "min", "15min", "h", "6h", "D", "7D", "28D", "364D"]
+
+    def __init__(self, date_col, max_groups):
+        super().__init__([date_col], parse_dates=True)
+        self.key = ("time_series", date_col)
+        self.max_groups = max_groups
+        self.grid = -1       # index into GRIDS; -1 = exact timestamps
+
+    def _by(self, chunk):
+        (s,) = super()._by(chunk)
+        return [s if self.grid < 0 else s.dt.floor(self.GRIDS[self.grid])]
+
+    def _trim(self, acc):
+        while len(acc) > self.max_groups and self.grid < len(self.GRIDS) - 1:
+            self.grid += 1
+            acc = acc.groupby(acc.index.floor(self.GRIDS[self.grid])).agg(
+                {c: MERGE_OPS[c[1]] for c in acc.columns}
+            )
+            print(f"🕒 {self.keys[0]}: over {self.max_groups} timestamps, bucketing by {self.GRIDS[self.grid]}")
+        return acc
+
+
+class _ScalarSource:
+    """sum/count/min/max of every single-column KPI in one DataFrame.agg per chunk."""
+
+    key = ("scalar",)
+
+    def __init__(self):
+        self.cols, self.acc = [], None
+
+    def request(self, col):
+        if col not in self.cols:
+            self.cols.append(col)
+
+    def add(self, chunk):
+        if not self.cols:
+            return  # only 'unique' KPIs, answered from the profile
+        part = _widen(chunk[self.cols]).agg(["sum", "count", "min", "max"]).T
+        if self.acc is None:
+            self.acc = part
+            return
+        self.acc = pd.DataFrame({
+            "sum": self.acc["sum"] + part["sum"],
+            "count": self.acc["count"] + part["count"],
+            "min": pd.concat([self.acc["min"], part["min"]], axis=1).min(axis=1),
+            "max": pd.concat([self.acc["max"], part["max"]], axis=1).max(axis=1),
+        })
+
+
+class _ProductSource:
+    """Row-wise product of several numeric columns; every aggregation of it is tracked."""
+
+    def __init__(self, cols):
+        self.cols = cols
+        self.key = ("product", tuple(cols))
+        self.total, self.n, self.nonzero = 0.0, 0, 0
+        self.min, self.max = np.inf, -np.inf
+
+    def add(self, chunk):
+        prod = np.prod([chunk[c].astype("float64") for c in self.cols], axis=0)
+        if not len(prod):
+            return
+        self.total += float(np.sum(prod))
+        self.n += len(prod)
+        self.nonzero += int(np.count_nonzero(prod))
+        self.min = float(np.min([self.min, np.min(prod)]))
+        self.max = float(np.max([self.max, np.max(prod)]))
+
+
+class _ValueCounts:
+    def __init__(self, col):
+        self.col, self.acc = col, None
+        self.key = ("value_counts", col)
+
+    def add(self, chunk):
+        vc = chunk[self.col].value_counts()
+        vc = vc[vc > 0]  # category columns list unobserved categories too
+        self.acc = vc if self.acc is None else self.acc.add(vc, fill_value=0)
+
+    def result(self):
+        if self.acc is None:
+            return {}
+        return self.acc.sort_values(ascending=False, kind="stable").head(10).astype(int).to_dict()
+
+
+class _ScatterHead:
+    def __init__(self, x, y):
+        self.x, self.y, self.rows = x, y, None
+        self.key = ("scatter", x, y)
+
+    def add(self, chunk):
+        if self.rows is None or len(self.rows) < SCATTER_POINTS:
+            head = chunk[[self.x, self.y]].head(SCATTER_POINTS)
+            self.rows = head if self.rows is None else pd.concat([self.rows, head]).head(SCATTER_POINTS)
+
+    def result(self):
+        rows = self.rows if self.rows is not None else pd.DataFrame(columns=[self.x, self.y])
+        return {
+            "labels": rows[self.x].astype(str).tolist(),
+            "series": [{"name": self.y, "values": rows[self.y].round(2).tolist()}],
+        }
+
+
+# --------------------------------------------------
+# Views: slice a KPI value / chart payload out of a finished source
+# --------------------------------------------------
+def _grouped_view(source, value_cols, agg):
+    if source.acc is None:
+        return []
+    if agg == "mean":
+        res = pd.DataFrame({c: source.acc[(c, "sum")] / source.acc[(c, "count")] for c in value_cols})
+    else:
+        res = pd.DataFrame({c: source.acc[(c, agg)] for c in value_cols})
+    return res.head(10).reset_index().to_dict(orient="records")
+
+
+def _time_series_view(source, num_col, max_points):
+    acc = source.acc[(num_col, "sum")] if source.acc is not None else pd.Series(dtype="float64")
+    if len(acc) > max_points:
+        # Shape-preserving reduction over the whole date range (x = time, so gaps keep their width)
+        x = acc.index.asi8 - acc.index.asi8[0] if isinstance(acc.index, pd.DatetimeIndex) else None
+        acc = acc.iloc[downsample_indices(acc.to_numpy(dtype="float64"), max_points, x, CHART_DOWNSAMPLE_METHOD)]
+    return {
+        "labels": pd.Series(acc.index).astype(str).tolist(),
+        "series": [{"name": num_col, "values": acc.round(2).tolist()}],
+    }
+
+
+def _category_totals_view(source, num_col):
+    acc = source.acc[(num_col, "sum")] if source.acc is not None else pd.Series(dtype="float64")
+    top = acc.nlargest(10)
+    return {
+        "labels": top.index.astype(str).tolist(),
+        "series": [{"name": num_col, "values": top.round(2).tolist()}],
+    }
+
+
+def _scalar_view(source, col, agg, profile):
+    if agg == "unique":
+        return profile.n_unique[col]
+    if source.acc is None:
+        return None
+    row = source.acc.loc[col]
+    if agg == "mean":
+        return float(row["sum"]) / row["count"] if row["count"] else float("nan")
+    if agg == "max":
+        return float(row["max"])
+    if agg == "min":
+        return float(row["min"])
+    if agg == "count":
+        return int(row["count"])
+    return float(row["sum"])
+
+
+def _product_view(source, agg):
+    if agg == "mean":
+        return source.total / source.n if source.n else float("nan")
+    if agg == "max":
+        return source.max
+    if agg == "min":
+        return source.min
+    if agg == "count":
+        return source.nonzero
+    return source.total
+
+
+def _result_view(source):
+    return source.result()
+
+
+# --------------------------------------------------
+# Plan compiler: KPI / chart definitions → shared sources + views
+# --------------------------------------------------
+class _Compiler:
+    def __init__(self, profile, max_points):
+        self.profile = profile
+        self.max_points = max_points
+        self.sources = {}
+
+    def _source(self, candidate):
+        return self.sources.setdefault(candidate.key, candidate)
+
+    def _grouped(self, keys, parse_dates=False):
+        # Already-parsed datetime keys group identically either way, so let them share a source
+        parse_dates = parse_dates and not all(is_datetime(self.profile.dtypes[k]) for k in keys)
+        return self._source(_GroupedSource(keys, parse_dates))
+
+    def kpi(self, kpi):
+        profile = self.profile
+        cols = [c for c in kpi.get("related_columns", []) if c in profile.dtypes]
+        agg = kpi.get("aggregation", "sum").lower()
+        if not cols:
+            return None
+
+        numeric_cols = [c for c in cols if c in profile.numeric_columns]
+        # Parsed date columns still act as grouping keys, as they did when loaded as text
+        cat_cols = [c for c in cols if is_categorical(profile.dtypes[c]) or is_datetime(profile.dtypes[c])]
+
+        if cat_cols and numeric_cols:
+            source = self._grouped(cat_cols)
+            source.request(numeric_cols, agg, limit=10)
+            return partial(_grouped_view, source, numeric_cols, agg)
+        if len(numeric_cols) >= 2:
+            return partial(_product_view, self._source(_ProductSource(numeric_cols)), agg)
+        if len(numeric_cols) == 1:
+            source = self._source(_ScalarSource())
+            if agg != "unique":
+                source.request(numeric_cols[0])
+            return partial(_scalar_view, source, numeric_cols[0], agg, profile)
+        if len(cat_cols) == 1 and agg == "unique":
+            return partial(_result_view, self._source(_ValueCounts(cat_cols[0])))
+        return None
+
+    def chart(self, chart_def):
+        profile = self.profile
+        cols = chart_def.get("columns", [])
+        if not cols or len(cols) < 2:
+            return None, None
+
+        cat_cols = [c for c in cols if c in profile.dtypes and is_categorical(profile.dtypes[c])]
+        num_cols = [c for c in cols if c in profile.numeric_columns]
+        date_cols = [c for c in cols if c in profile.dtypes and ("date" in c.lower() or is_datetime(profile.dtypes[c]))]
+
+        if date_cols and num_cols:
+            source = self._source(_TimeSeriesSource(date_cols[0], TIME_SERIES_MAX_GROUPS))
+            source.request([num_cols[-1]], "sum")
+            return partial(_time_series_view, source, num_cols[-1], self.max_points), chart_def.get("type", "bar")
+        if cat_cols and num_cols:
+            source = self._grouped([cat_cols[0]])
+            source.request([num_cols[-1]], "sum")
+            return partial(_category_totals_view, source, num_cols[-1]), chart_def.get("type", "bar")
+        if len(num_cols) >= 2:
+            return partial(_result_view, self._source(_ScatterHead(*num_cols[:2]))), "scatter"
+        return None, None
+
+
+def compile_plan(parsed, profile, max_points=None):
+    """
+    Compile the LLM plan into the minimal set of scans.
+    KPIs and charts grouped by the same key columns share one fused group-by,
+    all single-column KPIs share one DataFrame.agg, and identical requests
+    share a source outright.
+    Time-series charts are downsampled to max_points (default LINE_CHART_MAX_POINTS).
+    Returns (sources by key, KPI views, [(chart view, chart type)]); a None view
+    means the KPI / chart cannot be computed from the dataset.
+    """
+    compiler = _Compiler(profile, max_points or LINE_CHART_MAX_POINTS)
+    kpi_views, chart_views = [], []
+    for kpi in parsed.get("kpis", []):
+        try:
+            kpi_views.append(compiler.kpi(kpi))
+        except Exception as e:
+            print(f"⚠️ KPI calc failed for {kpi.get('name', '')}: {e}")
+            kpi_views.append(None)
+    for chart_def in parsed.get("charts", []):
+        try:
+            chart_views.append(compiler.chart(chart_def))
+        except Exception as e:
+            print(f"⚠️ Chart generation failed for {chart_def.get('title', '')}: {e}")
+            chart_views.append((None, None))
+    return compiler.sources, kpi_views, chart_views
+
+
+def execute_plan(chunks, parsed, profile, max_points=None):
+    """
+    Run every KPI and chart of the plan in one pass over `chunks` (an iterable
+    of DataFrames) and fill in their values / chart data.
+    """
+    sources, kpi_views, chart_views = compile_plan(parsed, profile, max_points)
+    print(f"🧮 Plan compiled: {len(kpi_views)} KPIs + {len(chart_views)} charts → {len(sources)} scans")
+
+    failed = set()
+    for chunk in chunks:
+        for key, source in sources.items():
+            if key in failed:
+                continue
+            try:
+                source.add(chunk)
+            except Exception as e:
+                print(f"⚠️ Aggregation failed ({type(source).__name__}): {e}")
+                failed.add(key)
+
+    def _evaluate(view):
+        if view is None or view.args[0].key in failed:
+            return None
+        try:
+            return view()
+        except Exception as e:
+            print(f"⚠️ Aggregation result failed ({view.func.__name__}): {e}")
+            return None
+
+    parsed["kpis"] = [{**kpi, "value": _evaluate(view)} for kpi, view in zip(parsed.get("kpis", []), kpi_views)]
+
+    parsed_charts = []
+    for chart_def, (view, chart_type) in zip(parsed.get("charts", []), chart_views):
+        data = _evaluate(view)
+        if data is None:
+            continue
+        parsed_charts.append({
+            "title": chart_def.get("title", "Untitled Chart"),
+            "type": chart_type,
+            "data": data,
+        })
+    parsed["charts"] = parsed_charts
+    print(f"✅ Generated {len(parsed_charts)} charts from AI definitions.")
+    return parsed
+
+
+def compute_plan_outputs(df, parsed, profile, max_points=None):
+    """Compute KPI values and chart-ready data for the AI plan (CPU-bound, runs in the worker pool)."""
+    return execute_plan([df], parsed, profile, max_points)
+
+
+def compute_plan_outputs_chunked(upload, parsed, profile, max_points=None):
+    """
+    Constant-memory counterpart of compute_plan_outputs: the same sources
+    are fed the CSV chunk by chunk, so the file is streamed once.
+    """
+    chunks = iter_chunks_with_dates(upload, dtype=chunk_dtypes(profile))
+    return execute_plan(chunks, parsed, profile, max_points)
@@ -6,5 +6,5 @@ def process_csv(file_bytes: bytes):
     df = pd.read_csv(io.BytesIO(file_bytes))
     return df
 
-def get_eda_summary(df: pd.DataFrame):
-    return dataframe_summary(df)
+def get_eda_summary(df: pd.DataFrame, profile=None):
+    return dataframe_summary(df, profile)
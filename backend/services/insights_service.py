@@ -1,26 +1,67 @@
-import json
-from core.config import llm
-from core.utils import to_json_str
+import asyncio
+from core.config import INSIGHT_MAX_TOPICS, INSIGHT_CONCURRENCY, INSIGHT_TIMEOUT_SECONDS, INSIGHT_CONTEXT_MAX_TOKENS
+from core.llm_gateway import llm_gateway
+from core.prompt_budget import fit_documents
 
-def refine_insights_with_rag(insights, vectorstore, eda):
+async def refine_insights_with_rag(insights, vectorstore):
     """
     Deep RAG-based insight generation:
     - Understands dataset context (via RAG)
     - Uses external knowledge (AI common sense / global data)
     - Produces long-form, structured insights
+    - Output order matches input order
     """
-    detailed_insights = []
+    topics = insights[:INSIGHT_MAX_TOPICS]  # limit for efficiency
+    detailed_insights = list(topics)
+    async for index, text, _ in iter_refined_insights(topics, vectorstore):
+        detailed_insights[index] = text
+    return detailed_insights
+
+
+async def iter_refined_insights(insights, vectorstore):
+    """
+    Yield (index, text, refined) for each topic as soon as it completes.
+    - Topics run concurrently (bounded by INSIGHT_CONCURRENCY), each with a timeout;
+      a failed or timed-out topic falls back to the raw topic text (refined=False)
+    - Each prompt carries only the context retrieved for its topic (the index already holds
+      the column profiles and domain summary), capped at INSIGHT_CONTEXT_MAX_TOKENS
+    """
+    semaphore = asyncio.Semaphore(max(1, INSIGHT_CONCURRENCY))
+
+    async def _bounded(index, topic):
+        async with semaphore:
+            try:
+                text = await asyncio.wait_for(
+                    _refine_topic(topic, vectorstore),
+                    timeout=INSIGHT_TIMEOUT_SECONDS,
+                )
+                return index, text, True
+            except asyncio.TimeoutError:
+                print(f"⚠️ Detailed RAG insight timed out for '{topic}'")
+            except Exception as e:
+                print(f"⚠️ Detailed RAG insight failed for '{topic}': {e}")
+            return index, topic, False
 
-    for topic in insights[:5]:  # limit for efficiency
-        try:
-            retrieved_docs = vectorstore.similarity_search(topic, k=5)
-            retrieved_context = "\n".join([d.page_content for d in retrieved_docs])
+    tasks = [asyncio.ensure_future(_bounded(i, t)) for i, t in enumerate(insights[:INSIGHT_MAX_TOPICS])]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Consumer stopped early (e.g. client disconnected) → drop pending LLM calls
+        for task in tasks:
+            task.cancel()
 
-            prompt = f"""
+
+async def _refine_topic(topic, vectorstore):
+    """Retrieve context for one topic and expand it into long-form analysis."""
+    retrieved_docs = await vectorstore.asimilarity_search(topic, k=5)
+    retrieved_context = fit_documents([d.page_content for d in retrieved_docs], INSIGHT_CONTEXT_MAX_TOKENS)
+
+    prompt = f"""
 You are an expert data scientist and domain analyst.
 
 You have access to:
-1. A dataset context built from its structure, statistics, and correlations.
+1. Dataset context retrieved for this topic (column statistics, correlations, domain summary).
 2. A generic insight or topic hint.
 3. Public knowledge (economic, environmental, or social, if relevant).
 
@@ -34,9 +75,6 @@ Each insight should include:
 - **Optional External Context:** (e.g., “this trend is consistent with global coffee consumption data”)
 
 ### Input:
-Dataset EDA Summary:
-{to_json_str(eda)}
-
 Retrieved Context:
 {retrieved_context}
 
@@ -48,12 +86,5 @@ Write 2-3 detailed paragraphs of analytical text.
 Be data-driven and contextual, not generic.
 """
 
-            res = llm.invoke(prompt)
-            text = res.content.strip().replace("```", "")
-            detailed_insights.append(text)
-
-        except Exception as e:
-            print(f"⚠️ Detailed RAG insight failed for '{topic}': {e}")
-            detailed_insights.append(topic)
-
-    return detailed_insights
+    reply = await llm_gateway.complete(prompt)
+    return reply.strip().replace("```", "")
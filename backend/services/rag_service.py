@@ -13,67 +13,192 @@
 
 
 
+import os
+import shutil
+import uuid
+from collections import OrderedDict
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
-from core.config import embeddings
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from core.clients import embeddings
+from core.config import (
+    EMBEDDING_BACKEND,
+    BRUTE_FORCE_MAX_DOCS,
+    EMBEDDING_CACHE_DIR,
+    RAG_INDEX_CACHE_DIR,
+    RAG_INDEX_CACHE_MAX_ITEMS,
+    PIPELINE_VERSION,
+)
 import pandas as pd
-import numpy as np
-from openai import OpenAI
+from core.executor import run_blocking
+from core.profiling import profile_dataframe
+from core.schema import schema_fingerprint
+from core.vector_store import NumpyVectorStore
 
-client = OpenAI()
+# Domain descriptions from the agent's plan call, keyed by schema fingerprint
+DOMAIN_CACHE_MAX_ITEMS = 256
+_domain_cache = OrderedDict()
 
-def build_rag_index(df: pd.DataFrame):
-    """Build a semantic + statistical RAG index from the dataset."""
+# Document embeddings memoized on disk: unchanged column summaries are never re-embedded
+# (local hashing embeddings are cheaper to recompute than to read back)
+if EMBEDDING_BACKEND == "local":
+    cached_embeddings = embeddings
+else:
+    cached_embeddings = CacheBackedEmbeddings.from_bytes_store(
+        embeddings,
+        LocalFileStore(EMBEDDING_CACHE_DIR),
+        namespace=embeddings.model,
+        key_encoder="sha256",
+    )
+
+
+async def build_rag_index(df: pd.DataFrame, profile=None, dataset_id: str = None):
+    """
+    Build a semantic + statistical RAG index from the dataset.
+    With a dataset_id (upload content hash) the finished index is saved and
+    loaded back for the same file; only new or changed documents are embedded.
+    The dataset domain description comes from the agent's plan call: it is
+    included here when a dataset with the same schema was described before,
+    otherwise attach_domain_description() adds it once the plan is ready.
+    """
+    # 0️⃣ Same file indexed before → load the saved index
+    index_dir = _index_dir(dataset_id) if dataset_id else None
+    if index_dir:
+        store = await run_blocking(_load_index, index_dir)
+        if store is not None:
+            print(f"📦 Loaded cached RAG index for {dataset_id}")
+            return store
+
+    # Column summaries and correlations come from the shared profile
+    if profile is None:
+        profile = await run_blocking(profile_dataframe, df)
+    docs = _build_documents(profile)
+
+    # 3️⃣ Dataset purpose (semantic understanding), reused for datasets with the same schema
+    domain_summary = _domain_cache.get(schema_fingerprint(profile))
+    if domain_summary:
+        docs.append(_domain_document(domain_summary))
+
+    # 4️⃣ Build the index (async embedding calls, cached per document).
+    # Small indexes are searched exactly with NumPy; FAISS only pays off for large ones.
+    store_cls = NumpyVectorStore if len(docs) <= BRUTE_FORCE_MAX_DOCS else FAISS
+    store = await store_cls.afrom_documents(docs, cached_embeddings)
+    if index_dir and domain_summary:
+        await run_blocking(_save_index, store, index_dir)
+    return store
+
+
+async def attach_domain_description(store, profile, domain_summary: str, dataset_id: str = None):
+    """
+    Add the agent's domain description to an index built without it, remember it
+    for this schema, and save the now complete index.
+    """
+    if not domain_summary:
+        return store
+    fingerprint = schema_fingerprint(profile)
+    _domain_cache[fingerprint] = domain_summary
+    _domain_cache.move_to_end(fingerprint)
+    while len(_domain_cache) > DOMAIN_CACHE_MAX_ITEMS:
+        _domain_cache.popitem(last=False)
+
+    if any(d.metadata.get("column") == "dataset_description" for d in _documents(store)):
+        return store
+    await store.aadd_documents([_domain_document(domain_summary)])
+    if dataset_id:
+        await run_blocking(_save_index, store, _index_dir(dataset_id))
+    return store
+
+
+def _domain_document(domain_summary: str) -> Document:
+    return Document(page_content=f"Dataset domain description: {domain_summary}", metadata={"column": "dataset_description"})
+
+
+def _documents(store):
+    if isinstance(store, NumpyVectorStore):
+        return store.documents
+    return list(store.docstore._dict.values())
+
+
+# --------------------------------------------------
+# Saved indexes (one directory per dataset hash + pipeline version + embedding model)
+# --------------------------------------------------
+def _index_dir(dataset_id: str) -> str:
+    return os.path.join(RAG_INDEX_CACHE_DIR, f"{dataset_id}-v{PIPELINE_VERSION}-{embeddings.model}")
+
+
+def _load_index(path: str):
+    if not os.path.isdir(path):
+        return None
+    try:
+        if NumpyVectorStore.exists(path):
+            store = NumpyVectorStore.load_local(path, cached_embeddings)
+        else:
+            # Only indexes this server wrote itself live here, so unpickling the docstore is safe
+            store = FAISS.load_local(path, cached_embeddings, allow_dangerous_deserialization=True)
+        os.utime(path)  # LRU: mark as recently used
+        return store
+    except Exception as e:
+        print("⚠️ Cached RAG index unreadable, rebuilding:", e)
+        return None
+
+
+def _save_index(store, path: str):
+    if os.path.isdir(path):
+        return
+    tmp = f"{path}.tmp-{uuid.uuid4().hex}"
+    try:
+        store.save_local(tmp)
+        os.rename(tmp, path)  # atomic: readers never see a half-written index
+    except OSError as e:
+        print("⚠️ Could not save RAG index:", e)
+        shutil.rmtree(tmp, ignore_errors=True)
+        return
+    _evict_indexes()
+
+
+def _evict_indexes():
+    entries = [
+        e for e in os.scandir(RAG_INDEX_CACHE_DIR)
+        if e.is_dir() and ".tmp-" not in e.name
+    ]
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for entry in entries[: max(0, len(entries) - RAG_INDEX_CACHE_MAX_ITEMS)]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def _build_documents(profile):
+    """Column-level summaries + pairwise correlation documents (read from the profile)."""
     docs = []
 
     # 1️⃣ Add column-level summaries
-    for col in df.columns:
-        series = df[col].dropna()
-        dtype = str(df[col].dtype)
-        unique_vals = series.nunique()
-        sample_vals = series.astype(str).head(5).tolist()
-        summary = ""
-
-        if np.issubdtype(df[col].dtype, np.number):
+    for col in profile.dtypes:
+        sample_vals = profile.samples[col]
+
+        if col in profile.top_values:
             summary = (
-                f"Column '{col}' is numeric with mean={series.mean():.2f}, "
-                f"std={series.std():.2f}, min={series.min():.2f}, max={series.max():.2f}."
+                f"Column '{col}' is categorical/text with {profile.n_unique[col]} unique values. "
+                f"Top values: {profile.top_values[col]}."
             )
         else:
-            top_vals = series.value_counts().head(5).to_dict()
-            summary = f"Column '{col}' is categorical/text with {unique_vals} unique values. Top values: {top_vals}."
+            stats = profile.numeric_stats[col]
+            summary = (
+                f"Column '{col}' is numeric with mean={stats['mean']:.2f}, "
+                f"std={stats['std']:.2f}, min={stats['min']:.2f}, max={stats['max']:.2f}."
+            )
 
         text = f"{summary}\nSample values: {', '.join(sample_vals)}"
         docs.append(Document(page_content=text, metadata={"column": col}))
 
     # 2️⃣ Add pairwise numeric correlation insights
-    num_cols = df.select_dtypes(include=np.number).columns
-    if len(num_cols) >= 2:
-        corr = df[num_cols].corr().abs().unstack().sort_values(ascending=False)
-        corr = corr[corr < 1].head(10)
+    top_corr = profile.top_correlations(10)
+    if top_corr:
         corr_text = "\n".join(
-            [f"Correlation between {a} and {b}: {v:.2f}" for (a, b), v in corr.items()]
+            [f"Correlation between {a} and {b}: {v:.2f}" for (a, b), v in top_corr]
         )
         docs.append(Document(page_content=f"Top numeric correlations:\n{corr_text}", metadata={"column": "correlations"}))
 
-    # 3️⃣ Ask AI to summarize dataset purpose (semantic understanding)
-    try:
-        preview = df.head(3).to_csv(index=False)
-        msg = f"Analyze this dataset preview and describe in 1-2 sentences what this dataset seems to represent:\n\n{preview}"
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a data analyst who infers dataset domains."},
-                {"role": "user", "content": msg}
-            ]
-        )
-        domain_summary = resp.choices[0].message.content.strip()
-        docs.append(Document(page_content=f"Dataset domain description: {domain_summary}", metadata={"column": "dataset_description"}))
-    except Exception as e:
-        print("⚠️ Domain summary generation failed:", e)
-
-    # 4️⃣ Build FAISS index
-    return FAISS.from_documents(docs, embeddings)
+    return docs
 
 def query_rag(store, query: str, k=3):
     return store.similarity_search(query, k=k)
\ No newline at end of file
@@ -1,141 +1,138 @@
 import os
-import json
+import re
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
-from prophet import Prophet
-from json import loads, JSONDecodeError
-
-# ✅ Unified OpenAI initialization (optional)
-try:
-    from openai import OpenAI
-    HAS_OPENAI = True
-except Exception:
-    HAS_OPENAI = False
-
-
-def _get_openai_client():
-    """Return initialized OpenAI client if key available."""
+from json import loads
+
+from core.executor import run_blocking, run_in_process
+from core.config import (
+    TREND_FREQ,
+    TREND_HORIZON,
+    TREND_MAX_POINTS,
+    TREND_PROPHET_MAX_POINTS,
+    FORECAST_WARM_START_ITEMS,
+    TREND_MAX_TARGETS,
+    TREND_MAX_SEGMENTS,
+    CHART_DOWNSAMPLE_METHOD,
+    TREND_DETECT_ROWS,
+    TREND_DETECT_MIN_CONFIDENCE,
+)
+from core.downsampling import downsample_indices
+from core.schema import is_numeric, parse_dates
+from core.result_cache import forecast_cache
+from core.llm_gateway import llm_gateway
+
+
+def _llm_available() -> bool:
+    """True when an OpenAI key is configured (the LLM gateway can answer)."""
     api_key = os.getenv("OPENAI_API_KEY")
-    if not HAS_OPENAI or api_key in (None, "", "None"):
+    if api_key in (None, "", "None"):
         print("⚙️ Running in heuristic mode (no OpenAI key found).")
-        return None
-    try:
-        print("🤖 Using OpenAI client with key.")
-        return OpenAI(api_key=api_key)
-    except Exception as e:
-        print("⚠️ OpenAI client init failed:", e)
-        return None
+        return False
+    return True
 
 
 # ------------------------------------------------------------
-# 1️⃣ Forecast feasibility detection (AI + heuristic fallback)
+# 1️⃣ Forecast feasibility detection (local heuristic, AI only when unsure)
 # ------------------------------------------------------------
-# def assess_forecastability(sample_df: pd.DataFrame):
-#     def _heuristic(df: pd.DataFrame):
-#         cols = df.columns.tolist()
-
-#         # Detect date-like
-#         ds_guess = None
-#         for c in cols:
-#             s = df[c]
-#             if np.issubdtype(s.dtype, np.datetime64):
-#                 ds_guess = c
-#                 break
-#             try:
-#                 pd.to_datetime(s, errors="raise", dayfirst=True)
-#                 ds_guess = c
-#                 break
-#             except Exception:
-#                 pass
-#         if ds_guess is None:
-#             for c in cols:
-#                 lc = c.lower()
-#                 if any(k in lc for k in ["date", "ds", "day", "month", "year"]):
-#                     ds_guess = c
-#                     break
-
-#         # Detect numeric
-#         bad_words = {"id", "code", "key"}
-#         num_candidates = []
-#         for c in cols:
-#             if c == ds_guess:
-#                 continue
-#             lc = c.lower()
-#             if any(w in lc for w in bad_words):
-#                 continue
-#             if pd.api.types.is_numeric_dtype(df[c]):
-#                 num_candidates.append(c)
-#         y_guess = None
-#         for pref in ["sales", "revenue", "amount", "value", "target", "qty", "price"]:
-#             for c in num_candidates:
-#                 if pref in c.lower():
-#                     y_guess = c
-#                     break
-#             if y_guess:
-#                 break
-#         if y_guess is None and num_candidates:
-#             y_guess = num_candidates[0]
-
-#         ok = ds_guess is not None and y_guess is not None
-#         reason = "Detected date and numeric target." if ok else "Could not find a date column and numeric target."
-#         return {"possible": ok, "ds": ds_guess, "y": y_guess, "reason": reason}
-
-#     # Try AI client
-#     client = _get_openai_client()
-#     # if not client:
-#     #     return _heuristic(sample_df)
-
-#     try:
-#         as_csv = sample_df.to_csv(index=False)
-#         cols_str = ", ".join(sample_df.columns.tolist())
-#         msg = f"""
-# You are given the first 3 rows of a dataset.
-# Decide if time-series forecasting is possible.
-# Return STRICT JSON: {{possible: bool, ds: string|null, y: string|null, reason: string}}.
-
-# Columns: {cols_str}
-
-# CSV (3 rows):
-# {as_csv}
-# """
-#         resp = client.chat.completions.create(
-#             model="gpt-4o-mini",
-#             messages=[
-#                 {"role": "system", "content": "You are a careful data analyst. Respond only in JSON."},
-#                 {"role": "user", "content": msg},
-#             ],
-#             temperature=0.2,
-#             max_tokens=250,
-#         )
-#         raw = (resp.choices[0].message.content or "").strip()
-#         print("🧠 Raw AI response:\n", raw[:500])
-
-#         # Extract JSON substring between first { and last }
-#         if "{" in raw and "}" in raw:
-#             json_str = raw[raw.find("{"): raw.rfind("}") + 1]
-#         else:
-#             json_str = raw
-
-#         try:
-#             data = loads(json_str)
-#         except Exception:
-#             print("⚠️ Could not parse AI output as JSON, falling back to heuristic.")
-#             return _heuristic(sample_df)
-
-        
-#         if not isinstance(data, dict):
-#             return _heuristic(sample_df)
-#         if not data.get("possible"):
-#             return _heuristic(sample_df)
-#         return data
-#     except Exception as e:
-#         print("⚠️ assess_forecastability AI error:", e)
-#         return _heuristic(sample_df)
-
-def assess_forecastability(sample_df: pd.DataFrame):
-    """Ask AI which columns represent time (ds) and numeric target (y). No fallback."""
-    client = _get_openai_client()
-    if not client:
+DATE_NAME_HINTS = {"date", "time", "timestamp", "day", "week", "month", "year", "period", "ds"}
+TARGET_NAME_HINTS = {"sales", "revenue", "amount", "value", "target", "qty", "quantity", "price", "total", "units"}
+ID_NAME_HINTS = {"id", "code", "key", "zip", "phone", "number", "no"}
+
+
+def _name_tokens(col) -> set:
+    """Lower-case words of a column name (snake_case / camelCase / spaces split)."""
+    text = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(col))
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _date_score(s: pd.Series, name: str) -> float:
+    """
+    How much a column looks like the time axis, in [0, 1]:
+    - 0.5 × share of non-null values that parse as dates
+    - 0.2 × monotonicity (share of steps going the dominant direction)
+    - 0.2 × regularity (share of gaps between distinct timestamps within 10% of the median gap)
+    - 0.1 × date-like column name
+    """
+    if is_numeric(s.dtype) or pd.api.types.is_bool_dtype(s.dtype):
+        return 0.0
+    values = s.dropna()
+    if values.empty:
+        return 0.0
+    parsed = parse_dates(values)
+    stamps = parsed.dropna().to_numpy(dtype="datetime64[ns]").astype("int64")
+    distinct = np.unique(stamps)
+    if len(distinct) < 2:
+        return 0.0
+
+    parse_rate = len(stamps) / len(values)
+    steps = np.diff(stamps)
+    monotonic = max((steps >= 0).mean(), (steps <= 0).mean())
+    gaps = np.diff(distinct)
+    median_gap = np.median(gaps)
+    regular = (np.abs(gaps - median_gap) <= 0.1 * median_gap).mean()
+    hint = 1.0 if _name_tokens(name) & DATE_NAME_HINTS else 0.0
+    return float(0.5 * parse_rate + 0.2 * monotonic + 0.2 * regular + 0.1 * hint)
+
+
+def _target_scores(df: pd.DataFrame) -> pd.Series:
+    """
+    How much each numeric column looks like a forecast target, in [0, 1] (vectorized over columns):
+    fill rate × variation (coefficient of variation, saturating at 5%) × (0.75 + 0.25 × target-like name).
+    ID-like columns (ID names, or strictly increasing integers) score 0.
+    """
+    cols = [c for c in df.columns if is_numeric(df[c].dtype)]
+    if not cols or df.empty:
+        return pd.Series(dtype="float64")
+    num = df[cols].astype("float64")
+    fill = num.notna().mean()
+    cv = (num.std() / num.mean().abs().replace(0, np.nan)).fillna(num.std() > 0).astype("float64")
+    variation = (cv / 0.05).clip(upper=1.0)
+    hint = pd.Series([1.0 if _name_tokens(c) & TARGET_NAME_HINTS else 0.0 for c in cols], index=cols)
+    named_id = pd.Series([bool(_name_tokens(c) & ID_NAME_HINTS) for c in cols], index=cols)
+    counter = pd.Series(
+        [pd.api.types.is_integer_dtype(df[c].dtype) and df[c].is_monotonic_increasing and df[c].is_unique for c in cols],
+        index=cols,
+    )
+    score = fill * variation * (0.75 + 0.25 * hint)
+    return score.where(~(named_id | counter), 0.0)
+
+
+def detect_forecast_columns(df: pd.DataFrame) -> dict:
+    """
+    Pick ds / y locally from a sample (no network). Confidence = ds score × y score,
+    reduced by 20% when the runner-up target scores within 0.1 of the best one.
+    """
+    date_scores = pd.Series({c: _date_score(df[c], c) for c in df.columns}, dtype="float64")
+    ds = date_scores.idxmax() if len(date_scores) and date_scores.max() > 0 else None
+    targets = _target_scores(df.drop(columns=[ds]) if ds is not None else df).sort_values(ascending=False)
+    y = targets.index[0] if len(targets) and targets.iloc[0] > 0 else None
+
+    if ds is None or y is None:
+        missing = "a date column" if ds is None else "a numeric target column"
+        return {"possible": False, "ds": ds, "y": y, "confidence": 0.0, "detector": "heuristic",
+                "reason": f"Could not find {missing}."}
+
+    confidence = float(date_scores[ds] * targets.iloc[0])
+    if len(targets) > 1 and targets.iloc[0] - targets.iloc[1] < 0.1:
+        confidence *= 0.8
+    return {
+        "possible": True,
+        "ds": ds,
+        "y": y,
+        "confidence": round(confidence, 3),
+        "detector": "heuristic",
+        "reason": f"Detected '{ds}' as the time axis and '{y}' as the target.",
+    }
+
+
+async def assess_forecastability(sample_df: pd.DataFrame):
+    """Ask AI which columns represent time (ds) and numeric target (y); used when the local detector is unsure."""
+    if not _llm_available():
         return {
             "possible": False,
             "ds": None,
@@ -166,16 +163,15 @@ CSV (first 3 rows):
 {as_csv}
 """
 
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
+        reply = await llm_gateway.complete(
+            [
                 {"role": "system", "content": "You are a careful data analyst. Respond only in JSON."},
                 {"role": "user", "content": msg},
             ],
             temperature=0.2,
             max_tokens=250,
         )
-        raw = (resp.choices[0].message.content or "").strip()
+        raw = (reply or "").strip()
         print("🧠 Raw AI response:\n", raw[:500])
 
         if "{" in raw and "}" in raw:
@@ -222,19 +218,27 @@ def _summary_stats(history: pd.DataFrame, forecast: pd.DataFrame):
 # ------------------------------------------------------------
 # 3️⃣ Main trend generation
 # ------------------------------------------------------------
-def generate_trends_with_ai(df: pd.DataFrame):
-    """Forecast + heuristic insights + frontend-friendly (decimated) output"""
+async def generate_trends_with_ai(df: pd.DataFrame, load_columns=None, freq: str = None, fast: bool = False,
+                                  targets=None, segment_by: str = None, max_points: int = None):
+    """
+    Forecast + heuristic insights + frontend-friendly output.
+    load_columns: optional callable(columns) -> DataFrame for disk-backed datasets;
+    `df` is then only a head sample and just the ds/y columns are loaded for fitting.
+    freq: "D" / "W" / "MS" / "auto" (default TREND_FREQ); fast: skip Prophet.
+    targets / segment_by: forecast several y columns and/or one series per segment
+    value; every series comes back in forecast_data["series"] on shared labels.
+    max_points: points sent per chart (default TREND_MAX_POINTS), history downsampled
+    with CHART_DOWNSAMPLE_METHOD.
+    """
     result = {"forecast_info": {}, "forecast_data": {}, "insights": {}}
 
-    # Normalize date columns
-    for col in df.columns:
-        if "date" in col.lower() or "time" in col.lower():
-            print("🧠 Converting possible date column:", col)
-            df[col] = pd.to_datetime(df[col], errors="coerce", dayfirst=True)
-
-    # 1️⃣ Assess forecastability
-    sample = df.head(3)
-    meta = assess_forecastability(sample)
+    # 1️⃣ Assess forecastability: local detector first, the LLM only when it is unsure
+    meta = await run_blocking(detect_forecast_columns, df.head(TREND_DETECT_ROWS))
+    print(f"🔎 Forecast columns: ds={meta['ds']} y={meta['y']} (confidence {meta['confidence']})")
+    if meta["confidence"] < TREND_DETECT_MIN_CONFIDENCE:
+        ai_meta = await assess_forecastability(df.head(3))
+        if ai_meta.get("possible") and ai_meta.get("ds") in df.columns and ai_meta.get("y") in df.columns:
+            meta = {**ai_meta, "confidence": meta["confidence"], "detector": "ai"}
     result["forecast_info"] = meta
 
     if not meta.get("possible"):
@@ -243,57 +247,24 @@ def generate_trends_with_ai(df: pd.DataFrame):
         return result
 
     try:
-        x_col, y_col = meta["ds"], meta["y"]
-        df_prophet = df[[x_col, y_col]].dropna().copy()
-        df_prophet[x_col] = pd.to_datetime(df_prophet[x_col], errors="coerce", dayfirst=True)
-        df_prophet = df_prophet.dropna(subset=[x_col])
-        df_prophet = df_prophet.rename(columns={x_col: "ds", y_col: "y"})
-        df_prophet = df_prophet.groupby("ds").sum().reset_index()
-
-        # 2️⃣ Fit Prophet model
-        from prophet import Prophet
-        model = Prophet()
-        model.fit(df_prophet)
-
-        # 3️⃣ Forecast
-        future = model.make_future_dataframe(periods=15)
-        forecast = model.predict(future)
-
-        # Keep full forecast for backend reference
-        full_points = len(forecast)
-
-        # 4️⃣ Downsample for frontend
-        max_points = 500
-        if full_points > max_points:
-            step = full_points // max_points
-            forecast = forecast.iloc[::step].reset_index(drop=True)
-            print(f"📉 Decimated forecast from {full_points} → {len(forecast)} points")
-
-        # 5️⃣ Build chart-ready result
-        result["forecast_data"] = {
-            "labels": forecast["ds"].dt.strftime("%Y-%m-%d").tolist(),
-            "series": [{
-                "name": y_col,
-                "values": forecast["yhat"].round(2).tolist()
-            }],
-            "x_col": x_col,
-            "y_col": y_col,
-            "total_points": int(full_points),
-            "sent_points": int(len(forecast))
-        }
-
-        result["forecast_info"] = {
-            "forecast_possible": True,
-            "x_axis": x_col,
-            "y_axis": y_col,
-            "reason": f"{meta.get('reason', '')} Forecast generated using '{x_col}' and '{y_col}'.",
-            "data_reduction": f"Sent {len(forecast)} of {full_points} points for performance."
-        }
-
-        # 6️⃣ Add summary insights
-        result["insights"] = {
-            "heuristics": _summary_stats(df_prophet, forecast)
-        }
+        max_points = max_points or TREND_MAX_POINTS
+        targets = [t for t in (targets or []) if t and t != meta["ds"]][:TREND_MAX_TARGETS] or [meta["y"]]
+        if load_columns is not None:
+            columns = [meta["ds"], *targets] + ([segment_by] if segment_by else [])
+            df = await run_blocking(load_columns, list(dict.fromkeys(columns)))
+
+        # 2️⃣–6️⃣ Resample + fit + forecast: one series in the worker pool, many in the process pool
+        if len(targets) == 1 and not segment_by:
+            forecast_result = await run_blocking(
+                _fit_and_forecast, df, meta["ds"], targets[0], freq, fast, None, max_points
+            )
+        else:
+            forecast_result = await _forecast_many(df, meta["ds"], targets, segment_by, freq, fast, max_points)
+        forecast_result["forecast_info"]["reason"] = (
+            f"{meta.get('reason', '')} {forecast_result['forecast_info']['reason']}"
+        )
+        forecast_result["forecast_info"]["detector"] = meta["detector"]
+        result.update(forecast_result)
 
     except Exception as e:
         print("⚠️ Forecasting failed:", e)
@@ -306,3 +277,333 @@ def generate_trends_with_ai(df: pd.DataFrame):
 
     return result
 
+
+async def _forecast_many(df: pd.DataFrame, x_col: str, targets, segment_by: str, freq: str, fast: bool,
+                         max_points: int):
+    """
+    Fit every (target, segment) series in parallel processes and merge them into one payload.
+    Each fit returns its whole history; the merged history is then downsampled once, keeping
+    the union of every series' shape-preserving picks so all series share max_points labels.
+    """
+    jobs, freq, grid = await run_blocking(_plan_series_jobs, df, x_col, targets, segment_by, freq)
+    outcomes = await asyncio.gather(
+        *(run_in_process(_fit_and_forecast, sub, x_col, y_col, freq, fast, grid, None) for _, y_col, sub in jobs),
+        return_exceptions=True,
+    )
+
+    done, failed = [], []
+    for (name, _, _), outcome in zip(jobs, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"⚠️ Forecast failed for {name}: {outcome}")
+            failed.append(f"{name} ({outcome})")
+        else:
+            done.append((name, outcome))
+    if not done:
+        raise ValueError(f"No series could be forecast: {'; '.join(failed)}")
+
+    # All series share the period grid, so labels line up; align defensively anyway
+    labels = sorted({label for _, r in done for label in r["forecast_data"]["labels"]})
+    series = []
+    for name, r in done:
+        values = dict(zip(r["forecast_data"]["labels"], r["forecast_data"]["series"][0]["values"]))
+        series.append({"name": name, "values": [values.get(label) for label in labels]})
+
+    # Downsample the shared history; the forecast horizon is always sent in full
+    n_hist = max(len(labels) - TREND_HORIZON, 0)
+    budget = max((max_points - TREND_HORIZON) // len(series), 2)
+    keep = np.unique(np.concatenate(
+        [_history_positions(s["values"][:n_hist], budget) for s in series] + [np.arange(n_hist, len(labels))]
+    ))
+    labels = [labels[i] for i in keep]
+    for s in series:
+        s["values"] = [s["values"][i] for i in keep]
+
+    first = done[0][1]
+    models = sorted({r["forecast_info"]["model"] for _, r in done})
+    reason = f"Forecast generated for {len(done)} series over '{x_col}'"
+    reason += f" split by '{segment_by}'." if segment_by else "."
+    if failed:
+        reason += f" Skipped: {'; '.join(failed)}."
+    return {
+        "forecast_data": {
+            "labels": labels,
+            "series": series,
+            "x_col": x_col,
+            "y_col": targets[0],
+            "targets": targets,
+            "segment_by": segment_by,
+            "total_points": first["forecast_data"]["total_points"],
+            "sent_points": len(labels),
+        },
+        "forecast_info": {
+            "forecast_possible": True,
+            "x_axis": x_col,
+            "y_axis": targets[0],
+            "model": "/".join(models),
+            "frequency": first["forecast_info"]["frequency"],
+            "reason": reason,
+            "data_reduction": (
+                f"Resampled each series to {first['forecast_data']['total_points'] - TREND_HORIZON} "
+                f"{first['forecast_info']['frequency']} periods; "
+                f"sent {len(labels)} of {first['forecast_data']['total_points']} points per series."
+            ),
+        },
+        "insights": {
+            "heuristics": " ".join(f"{name}: {r['insights']['heuristics']}" for name, r in done),
+            "per_series": {name: r["insights"]["heuristics"] for name, r in done},
+        },
+    }
+
+
+def _plan_series_jobs(df: pd.DataFrame, x_col: str, targets, segment_by: str, freq: str):
+    """Split the data into (name, y column, sub-DataFrame) jobs over one shared period grid."""
+    ds = parse_dates(df[x_col])
+    valid = ds.dropna()
+    if valid.nunique() < 2:
+        raise ValueError("Not enough distinct timestamps to forecast.")
+    freq = freq if freq and freq != "auto" else TREND_FREQ
+    if freq == "auto":
+        freq = _infer_frequency(valid, TREND_MAX_POINTS)
+    if freq not in FREQ_ORDER:
+        raise ValueError(f"Unsupported frequency '{freq}' (use one of {', '.join(FREQ_ORDER)} or auto).")
+    periods = pd.Series(1, index=pd.DatetimeIndex(valid)).resample(freq).size().index
+    grid = (periods[0], periods[-1])
+
+    missing = [c for c in [*targets, segment_by] if c and c not in df.columns]
+    if missing:
+        raise ValueError(f"Unknown column(s): {', '.join(missing)}")
+
+    data = df[[x_col, *targets]].assign(**{x_col: ds})
+    jobs = []
+    if segment_by:
+        segments = df[segment_by].value_counts().head(TREND_MAX_SEGMENTS).index
+        for segment in segments:
+            mask = (df[segment_by] == segment).to_numpy()
+            for y_col in targets:
+                name = f"{y_col} · {segment}" if len(targets) > 1 else str(segment)
+                jobs.append((name, y_col, data.loc[mask, [x_col, y_col]]))
+    else:
+        for y_col in targets:
+            jobs.append((y_col, y_col, data[[x_col, y_col]]))
+    return jobs, freq, grid
+
+
+# ------------------------------------------------------------
+# 4️⃣ Resampling + forecasters
+# ------------------------------------------------------------
+FREQ_ORDER = ["D", "W", "MS"]
+FREQ_NAMES = {"D": "daily", "W": "weekly", "MS": "monthly"}
+FREQ_DAYS = {"D": 1, "W": 7, "MS": 30.44}
+SEASON_LENGTH = {"D": 7, "W": 52, "MS": 12}
+
+
+def _infer_frequency(ds: pd.Series, max_points: int) -> str:
+    """Natural spacing of the timestamps, coarsened until the span fits max_points periods."""
+    spacing = ds.sort_values().diff().median()
+    if pd.isna(spacing) or spacing < pd.Timedelta(days=7):
+        freq = "D"
+    elif spacing < pd.Timedelta(days=28):
+        freq = "W"
+    else:
+        freq = "MS"
+
+    span_days = (ds.max() - ds.min()) / pd.Timedelta(days=1)
+    while freq != "MS" and span_days / FREQ_DAYS[freq] > max_points:
+        freq = FREQ_ORDER[FREQ_ORDER.index(freq) + 1]
+    return freq
+
+
+def _prepare_series(df: pd.DataFrame, x_col: str, y_col: str, freq: str = None, grid=None):
+    """
+    Sum y per period on a regular grid (empty periods are NaN). Returns (series, freq, raw timestamps).
+    grid: optional (first, last) period shared by several series so their labels line up.
+    """
+    data = df[[x_col, y_col]].dropna().copy()
+    data[x_col] = parse_dates(data[x_col])
+    data = data.dropna(subset=[x_col])
+    ds = data[x_col]
+    y = data[y_col].astype("float64")  # nullable ints / float32 from load-time downcasting
+    if ds.nunique() < 2:
+        raise ValueError("Not enough distinct timestamps to forecast.")
+
+    freq = freq if freq and freq != "auto" else TREND_FREQ
+    if freq == "auto":
+        freq = _infer_frequency(ds, TREND_MAX_POINTS)
+    if freq not in FREQ_ORDER:
+        raise ValueError(f"Unsupported frequency '{freq}' (use one of {', '.join(FREQ_ORDER)} or auto).")
+
+    series = y.groupby(ds).sum().resample(freq).sum(min_count=1)
+    if grid is not None:
+        series = series.reindex(pd.date_range(grid[0], grid[1], freq=freq))
+    return series, freq, int(ds.nunique())
+
+
+def _fast_forecast(y: np.ndarray, freq: str, horizon: int) -> np.ndarray:
+    """
+    Vectorized linear trend + seasonal profile (mean detrended residual per phase).
+    `y` lies on a regular grid and may contain NaN gaps; returns yhat for history + horizon.
+    """
+    n = len(y)
+    t = np.arange(n + horizon, dtype="float64")
+    observed = ~np.isnan(y)
+    slope, intercept = np.polyfit(t[:n][observed], y[observed], 1)
+    yhat = intercept + slope * t
+
+    period = SEASON_LENGTH[freq]
+    if observed.sum() >= 2 * period:
+        phase = np.arange(n + horizon) % period
+        resid = y[observed] - yhat[:n][observed]
+        counts = np.bincount(phase[:n][observed], minlength=period)
+        seasonal = np.bincount(phase[:n][observed], weights=resid, minlength=period) / np.maximum(counts, 1)
+        yhat = yhat + (seasonal - seasonal.mean())[phase]
+    return yhat
+
+
+# ------------------------------------------------------------
+# 5️⃣ Forecast cache + Prophet warm start
+# ------------------------------------------------------------
+# Fitted parameters of recent series, for warm-starting refits when rows are appended:
+# fingerprint of the series minus its last period -> {"freq", "start", "n", "params"}
+_warm_starts = OrderedDict()
+_warm_starts_lock = threading.Lock()
+
+
+def _series_fingerprint(series: pd.Series, *params) -> str:
+    h = hashlib.sha256(repr(params).encode())
+    h.update(series.index.asi8.tobytes())
+    h.update(series.to_numpy(dtype="float64").tobytes())
+    return h.hexdigest()
+
+
+def _stan_init(model) -> dict:
+    """Fitted Prophet parameters in the form Prophet.fit(init=...) accepts."""
+    init = {name: model.params[name][0][0] for name in ["k", "m", "sigma_obs"]}
+    init.update({name: model.params[name][0] for name in ["delta", "beta"]})
+    return init
+
+
+def _find_warm_start(series: pd.Series, freq: str):
+    """Parameters of an earlier fit whose series is a prefix of this one (its last, possibly partial, period excluded)."""
+    with _warm_starts_lock:
+        candidates = list(_warm_starts.items())
+    for head_key, entry in reversed(candidates):
+        n = entry["n"]
+        if entry["freq"] != freq or entry["start"] != series.index[0] or not 1 < n <= len(series):
+            continue
+        if _series_fingerprint(series.iloc[: n - 1], freq) == head_key:
+            return entry["params"]
+    return None
+
+
+def _remember_fit(series: pd.Series, freq: str, model):
+    head_key = _series_fingerprint(series.iloc[:-1], freq)
+    with _warm_starts_lock:
+        _warm_starts[head_key] = {"freq": freq, "start": series.index[0], "n": len(series), "params": _stan_init(model)}
+        _warm_starts.move_to_end(head_key)
+        while len(_warm_starts) > FORECAST_WARM_START_ITEMS:
+            _warm_starts.popitem(last=False)
+
+
+def _fit_prophet(history: pd.DataFrame, series: pd.Series, freq: str):
+    from prophet import Prophet
+    init = _find_warm_start(series, freq)
+    if init is not None:
+        try:
+            model = Prophet()
+            model.fit(history, init=init)
+            print("♻️ Prophet warm-started from the previous fit of this series")
+            _remember_fit(series, freq, model)
+            return model
+        except Exception as e:
+            # e.g. a seasonality switched on as the history grew, so parameter shapes changed
+            print("⚠️ Prophet warm start failed, refitting from scratch:", e)
+    model = Prophet()
+    model.fit(history)
+    _remember_fit(series, freq, model)
+    return model
+
+
+def _history_positions(values, budget: int):
+    """Positions of the history points to send: all of them, or `budget` chosen by CHART_DOWNSAMPLE_METHOD."""
+    values = pd.Series(values, dtype="float64")
+    if len(values) <= budget:
+        return np.arange(len(values))
+    # Empty periods are bridged so they neither win nor break the triangle areas
+    filled = values.interpolate(limit_direction="both").fillna(0.0).to_numpy()
+    return downsample_indices(filled, budget, method=CHART_DOWNSAMPLE_METHOD)
+
+
+def _fit_and_forecast(df: pd.DataFrame, x_col: str, y_col: str, freq: str = None, fast: bool = False, grid=None,
+                      max_points: int = None):
+    """
+    Resample (x_col, y_col), fit Prophet (or the fast forecaster) and predict only
+    the points sent to the frontend (CPU-bound): the history downsampled so that
+    history + horizon fit max_points (None → send every period). Results are cached
+    by series fingerprint + forecast parameters.
+    """
+    # 1️⃣ Aggregate to a regular period grid
+    series, freq, raw_points = _prepare_series(df, x_col, y_col, freq, grid)
+    if series.count() < 2:
+        raise ValueError(f"Not enough data points for '{y_col}'.")
+    use_fast = fast or len(series) > TREND_PROPHET_MAX_POINTS
+    cache_key = _series_fingerprint(
+        series, x_col, y_col, freq, use_fast, TREND_HORIZON, max_points, CHART_DOWNSAMPLE_METHOD
+    )
+    cached = forecast_cache.get(cache_key)
+    if cached is not None:
+        print(f"📦 Forecast cache hit for '{y_col}' over '{x_col}'")
+        return cached
+
+    history = series.dropna().rename("y").rename_axis("ds").reset_index()
+    future_index = pd.date_range(series.index[-1], periods=TREND_HORIZON + 1, freq=freq)[1:]
+
+    # Points actually sent: shape-preserving subset of the history + the forecast horizon
+    budget = max(max_points - TREND_HORIZON, 2) if max_points else len(series)
+    hist_pos = _history_positions(series.to_numpy(), budget)
+    ds_out = series.index[hist_pos].append(future_index)
+
+    # 2️⃣–3️⃣ Fit + predict
+    if use_fast:
+        yhat_all = _fast_forecast(series.to_numpy(), freq, TREND_HORIZON)
+        yhat = np.concatenate([yhat_all[hist_pos], yhat_all[len(series):]])
+    else:
+        model = _fit_prophet(history, series, freq)
+        yhat = model.predict(pd.DataFrame({"ds": ds_out}))["yhat"].to_numpy()
+
+    forecast = pd.DataFrame({"ds": ds_out, "yhat": yhat})
+    model_name = "fast" if use_fast else "prophet"
+    total_points = len(series) + TREND_HORIZON
+    print(f"📈 {model_name} forecast on {len(series)} {FREQ_NAMES[freq]} periods ({raw_points} timestamps), sent {len(ds_out)} points")
+
+    # 4️⃣ Build chart-ready result
+    result = {
+        "forecast_data": {
+            "labels": forecast["ds"].dt.strftime("%Y-%m-%d").tolist(),
+            "series": [{
+                "name": y_col,
+                "values": forecast["yhat"].round(2).tolist()
+            }],
+            "x_col": x_col,
+            "y_col": y_col,
+            "total_points": int(total_points),
+            "sent_points": int(len(ds_out))
+        },
+        "forecast_info": {
+            "forecast_possible": True,
+            "x_axis": x_col,
+            "y_axis": y_col,
+            "model": model_name,
+            "frequency": FREQ_NAMES[freq],
+            "reason": f"Forecast generated using '{x_col}' and '{y_col}'.",
+            "data_reduction": (
+                f"Resampled {raw_points} timestamps to {len(series)} {FREQ_NAMES[freq]} periods; "
+                f"sent {len(ds_out)} of {total_points} points."
+            )
+        },
+        # 5️⃣ Add summary insights
+        "insights": {
+            "heuristics": _summary_stats(history, forecast)
+        },
+    }
+    forecast_cache.put(cache_key, result)
+    return result
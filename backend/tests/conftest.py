@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Offline, isolated settings; must be set before core.config is imported
+_cache_root = tempfile.mkdtemp(prefix="dashboard-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("EMBEDDING_BACKEND", "local")
+os.environ.setdefault("CSV_CHUNK_ROWS", "1000")   # small chunks so chunked-mode tests span several
+for name in ("RESULT_CACHE_DIR", "EMBEDDING_CACHE_DIR", "RAG_INDEX_CACHE_DIR", "FORECAST_CACHE_DIR", "LLM_CACHE_DIR"):
+    os.environ.setdefault(name, os.path.join(_cache_root, name.lower()))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
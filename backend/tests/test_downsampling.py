@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from core.downsampling import downsample_indices, lttb_indices, minmax_indices
+
+
+def _noisy_series(n=10_000, seed=0):
+    rng = np.random.default_rng(seed)
+    y = np.sin(np.linspace(0, 20, n)) + rng.normal(0, 0.05, n)
+    y[n // 3] = 25.0        # isolated spike
+    y[7 * n // 9] = -25.0   # isolated dip
+    return y
+
+
+@pytest.mark.parametrize("select", [lttb_indices, minmax_indices])
+def test_keeps_endpoints_and_budget(select):
+    y = _noisy_series()
+    idx = select(y, 100)
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert len(idx) <= 100
+    assert np.all(np.diff(idx) > 0)
+
+
+@pytest.mark.parametrize("select", [lttb_indices, minmax_indices])
+def test_keeps_isolated_peaks(select):
+    y = _noisy_series()
+    idx = set(select(y, 100).tolist())
+    assert {len(y) // 3, 7 * len(y) // 9} <= idx
+
+
+def test_minmax_keeps_every_bucket_extreme():
+    y = _noisy_series()
+    idx = minmax_indices(y, 100)
+    assert y[idx].max() == y.max() and y[idx].min() == y.min()
+
+
+def test_short_series_unchanged():
+    y = np.arange(10, dtype="float64")
+    assert lttb_indices(y, 50).tolist() == list(range(10))
+    assert minmax_indices(y, 50).tolist() == list(range(10))
+
+
+def test_minimum_point_counts():
+    y = _noisy_series(1_000)
+    assert len(lttb_indices(y, 1)) == 3
+    assert len(minmax_indices(y, 3)) <= 4
+
+
+def test_lttb_uses_x_spacing():
+    # Uneven x: the point after a long gap carries the shape and must be picked
+    x = np.concatenate([np.arange(500), np.arange(500) + 10_000]).astype("float64")
+    y = np.concatenate([np.zeros(500), np.ones(500)])
+    idx = lttb_indices(y, 20, x)
+    assert 500 in idx.tolist() or 499 in idx.tolist()
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        downsample_indices(np.arange(10.0), 5, method="average")
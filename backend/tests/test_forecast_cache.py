@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import services.trends_service as trends
+
+
+def _daily(n, seed, start="2023-03-01"):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "day": pd.date_range(start, periods=n, freq="D"),
+        "sales": 100 + np.arange(n) + rng.normal(0, 5, n),
+    })
+
+
+@pytest.fixture
+def fast_calls(monkeypatch):
+    calls = []
+    real = trends._fast_forecast
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(trends, "_fast_forecast", counting)
+    return calls
+
+
+def test_identical_series_is_served_from_cache(fast_calls):
+    df = _daily(90, seed=101)
+    first = trends._fit_and_forecast(df, "day", "sales", "D", True, None, 40)
+    second = trends._fit_and_forecast(df, "day", "sales", "D", True, None, 40)
+    assert second == first
+    assert len(fast_calls) == 1
+
+
+def test_changed_data_or_parameters_miss_the_cache(fast_calls):
+    df = _daily(90, seed=102)
+    trends._fit_and_forecast(df, "day", "sales", "D", True, None, 40)
+    trends._fit_and_forecast(df, "day", "sales", "D", True, None, 60)      # other point budget
+    changed = df.copy()
+    changed.loc[10, "sales"] += 1
+    trends._fit_and_forecast(changed, "day", "sales", "D", True, None, 40)
+    assert len(fast_calls) == 3
+
+
+class _FittedModel:
+    """Stand-in exposing Prophet's fitted `params` layout."""
+
+    def __init__(self, k):
+        self.params = {
+            "k": np.array([[k]]), "m": np.array([[0.5]]), "sigma_obs": np.array([[0.1]]),
+            "delta": np.zeros((1, 3)), "beta": np.zeros((1, 2)),
+        }
+
+
+def _series(n, seed):
+    return _daily(n, seed).set_index("day")["sales"]
+
+
+def test_warm_start_found_for_appended_periods(monkeypatch):
+    monkeypatch.setattr(trends, "_warm_starts", type(trends._warm_starts)())
+    series = _series(60, seed=7)
+    trends._remember_fit(series, "D", _FittedModel(k=0.25))
+
+    grown = _series(61, seed=7)
+    grown.iloc[:60] = series                               # same history + one new period
+    assert trends._find_warm_start(grown, "D")["k"] == 0.25
+    # The last (possibly partial) period may change between uploads
+    revised = series.copy()
+    revised.iloc[-1] += 10
+    assert trends._find_warm_start(revised, "D") is not None
+
+    edited = grown.copy()
+    edited.iloc[5] += 1                                     # history rewritten → no reuse
+    assert trends._find_warm_start(edited, "D") is None
+    assert trends._find_warm_start(grown, "W") is None
+
+
+def test_warm_starts_are_bounded(monkeypatch):
+    monkeypatch.setattr(trends, "_warm_starts", type(trends._warm_starts)())
+    monkeypatch.setattr(trends, "FORECAST_WARM_START_ITEMS", 2)
+    for seed in range(3):
+        trends._remember_fit(_series(30, seed), "D", _FittedModel(k=seed))
+    assert len(trends._warm_starts) == 2
+    assert trends._find_warm_start(_series(30, 0), "D") is None
+    assert trends._find_warm_start(_series(30, 2), "D")["k"] == 2
+
+
+def test_prophet_refit_is_warm_started(monkeypatch):
+    pytest.importorskip("prophet")
+    monkeypatch.setattr(trends, "_warm_starts", type(trends._warm_starts)())
+    df = _daily(61, seed=11)
+    head = df.iloc[:60]
+    trends._fit_and_forecast(head, "day", "sales", "D", False, None, None)
+    series, _, _ = trends._prepare_series(df, "day", "sales", "D")
+    assert trends._find_warm_start(series, "D") is not None
+    result = trends._fit_and_forecast(df, "day", "sales", "D", False, None, None)
+    assert result["forecast_info"]["model"] == "prophet"
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from core.config import TREND_DETECT_MIN_CONFIDENCE
+from services.trends_service import detect_forecast_columns
+
+
+def _sales(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "order_id": np.arange(1, n + 1),                                    # counter: never a target
+        "period": pd.date_range("2023-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        "store": rng.choice(["North", "South"], n),
+        "revenue": rng.gamma(2.0, 50.0, n).round(2),
+    })
+
+
+def test_detects_iso_text_dates_confidently():
+    meta = detect_forecast_columns(_sales())
+    assert (meta["possible"], meta["ds"], meta["y"]) == (True, "period", "revenue")
+    assert meta["confidence"] >= TREND_DETECT_MIN_CONFIDENCE
+    assert meta["detector"] == "heuristic"
+
+
+def test_text_and_parsed_dates_score_the_same():
+    text = _sales()
+    parsed = text.assign(period=pd.to_datetime(text["period"]))
+    assert detect_forecast_columns(text)["confidence"] == detect_forecast_columns(parsed)["confidence"]
+
+
+def test_day_first_dates_are_understood():
+    df = _sales()
+    df["period"] = pd.to_datetime(df["period"]).dt.strftime("%d/%m/%Y")
+    meta = detect_forecast_columns(df)
+    assert meta["ds"] == "period" and meta["confidence"] >= TREND_DETECT_MIN_CONFIDENCE
+
+
+def test_ambiguous_targets_lower_confidence():
+    df = _sales()
+    clear = detect_forecast_columns(df)["confidence"]
+    df["units"] = (df["revenue"] / 9).round(1)    # second target-like column, just as strong
+    assert detect_forecast_columns(df)["confidence"] < clear
+
+
+def test_no_date_column():
+    meta = detect_forecast_columns(_sales().drop(columns=["period"]))
+    assert meta["possible"] is False and meta["ds"] is None
+    assert meta["confidence"] == 0.0
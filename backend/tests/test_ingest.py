@@ -0,0 +1,55 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.ingest import SpooledUpload, load_dataframe, profile_csv_chunks
+from core.profiling import profile_dataframe
+from services.dashboard_engine import compute_plan_outputs, compute_plan_outputs_chunked
+
+
+def _plan():
+    return {
+        "kpis": [{"name": "Units", "related_columns": ["units"], "aggregation": "sum"}],
+        "charts": [
+            {"title": "Units over time", "type": "line", "columns": ["timestamp", "units"]},
+            {"title": "Units by store", "type": "bar", "columns": ["store", "units"]},
+        ],
+    }
+
+
+@pytest.fixture
+def upload():
+    rng = np.random.default_rng(5)
+    n = 2_500
+    df = pd.DataFrame({
+        # No "date" in the name: only content-based detection makes this the time axis
+        "timestamp": pd.date_range("2024-02-01", periods=n, freq="h").strftime("%Y-%m-%d %H:%M:%S"),
+        "store": rng.choice(["North", "South"], n),
+        "units": rng.integers(1, 9, n),
+    })
+    body = df.to_csv(index=False).encode()
+    return SpooledUpload(hashlib.sha256(body).hexdigest(), len(body), data=body)
+
+
+def test_chunked_mode_detects_dates_like_in_memory(upload):
+    df = load_dataframe(upload)
+    profile, sample = profile_csv_chunks(upload)
+
+    assert str(df["timestamp"].dtype).startswith("datetime64")
+    assert profile.dtypes["timestamp"] == str(df["timestamp"].dtype)
+    assert str(sample["timestamp"].dtype) == profile.dtypes["timestamp"]
+    assert profile_dataframe(df).n_unique["timestamp"] == profile.n_unique["timestamp"]
+
+
+def test_chunked_mode_builds_the_same_time_series(upload):
+    df = load_dataframe(upload)
+    in_memory = compute_plan_outputs(df, _plan(), profile_dataframe(df), max_points=100)
+    profile, _ = profile_csv_chunks(upload)
+    chunked = compute_plan_outputs_chunked(upload, _plan(), profile, max_points=100)
+
+    line = in_memory["charts"][0]
+    assert line["title"] == "Units over time" and len(line["data"]["labels"]) == 100
+    assert chunked["charts"] == in_memory["charts"]
+    assert chunked["kpis"] == in_memory["kpis"]
@@ -0,0 +1,66 @@
+import pytest
+
+from core.json_repair import parse_json_lenient
+
+
+def test_valid_json_passes_through():
+    assert parse_json_lenient('{"a": 1, "b": [1, 2]}') == {"a": 1, "b": [1, 2]}
+
+
+def test_markdown_fence_and_surrounding_prose():
+    assert parse_json_lenient('```json\n{"a": 1}\n```') == {"a": 1}
+    assert parse_json_lenient('Sure! {"a": 1} Hope this helps.') == {"a": 1}
+
+
+def test_comments_and_trailing_commas():
+    text = '{"a": 1, // the count\n "b": [1, 2,], # why\n "c": 3,}'
+    assert parse_json_lenient(text) == {"a": 1, "b": [1, 2], "c": 3}
+
+
+def test_python_literals_and_single_quotes():
+    assert parse_json_lenient("{'a': True, 'b': None, 'c': 'it\"s'}") == {"a": True, "b": None, "c": 'it"s'}
+
+
+def test_raw_newline_inside_string():
+    assert parse_json_lenient('{"a": "line1\nline2"}') == {"a": "line1\nline2"}
+
+
+def test_truncated_output_is_closed():
+    assert parse_json_lenient('{"x": [1, 2') == {"x": [1, 2]}
+    truncated = '{"kpis": [{"name": "Revenue"}, {"name": "Or'
+    assert parse_json_lenient(truncated) == {"kpis": [{"name": "Revenue"}, {"name": "Or"}]}
+
+
+def test_truncated_key_is_cut_back_to_last_complete_member():
+    text = '{"kpis": [{"name": "Revenue"}], "charts": [{"ti'
+    assert parse_json_lenient(text) == {"kpis": [{"name": "Revenue"}]}
+
+
+def test_no_json_raises():
+    with pytest.raises(ValueError):
+        parse_json_lenient("I cannot help with that.")
+
+
+def test_curly_quotes_inside_strings_are_kept():
+    text = '{"industry": "Retail", "insights": {"S": ["He said “hi” there"]}, "kpis": [{"name": "a"},],}'
+    assert parse_json_lenient(text) == {
+        "industry": "Retail",
+        "insights": {"S": ["He said “hi” there"]},
+        "kpis": [{"name": "a"}],
+    }
+
+
+def test_curly_quotes_as_delimiters():
+    assert parse_json_lenient("{“a”: ‘b’, \"c\": [1,],}") == {"a": "b", "c": [1]}
+
+
+def test_non_ascii_text_outside_strings():
+    assert parse_json_lenient('{"a": 1,} Voilà') == {"a": 1}
+    with pytest.raises(ValueError):
+        parse_json_lenient('{"a": Voilà}')
+
+
+def test_complete_but_broken_reply_is_not_cut_back():
+    # Balanced brackets: the reply was not truncated, so a partial object would silently lose data
+    with pytest.raises(ValueError):
+        parse_json_lenient('{"a": [1, 2}, "b": 3}')
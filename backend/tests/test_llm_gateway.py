@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+
+from core.llm_gateway import LLMGateway
+from core.result_cache import ResultCache
+
+
+class _Reply:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = {"input_tokens": 7, "output_tokens": 3}
+
+
+class CountingModel:
+    model_name = "counting"
+    temperature = 0.0
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def ainvoke(self, messages, **params):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return _Reply(f"reply {self.calls}")
+
+
+def _gateway(tmp_path, model, ttl_seconds=3600):
+    return LLMGateway(lambda: model, ResultCache(str(tmp_path), 10_000_000, "1"), ttl_seconds)
+
+
+def test_repeated_prompt_is_served_from_cache(tmp_path):
+    model = CountingModel()
+    gateway = _gateway(tmp_path, model)
+
+    async def run():
+        first = await gateway.complete("hello", max_tokens=10)
+        second = await gateway.complete("hello", max_tokens=10)
+        other = await gateway.complete("hello", max_tokens=20)   # different params → different key
+        return first, second, other
+
+    first, second, other = asyncio.run(run())
+    assert first == second == "reply 1" and other == "reply 2"
+    metrics = gateway.metrics()
+    assert (metrics["calls"], metrics["cache_hits"]) == (2, 1)
+    assert (metrics["input_tokens"], metrics["output_tokens"]) == (14, 6)
+
+
+def test_concurrent_identical_prompts_share_one_call(tmp_path):
+    model = CountingModel(delay=0.05)
+    gateway = _gateway(tmp_path, model)
+
+    async def run():
+        return await asyncio.gather(*(gateway.complete([{"role": "user", "content": "q"}]) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["reply 1"] * 10
+    assert model.calls == 1
+    assert gateway.metrics()["coalesced"] == 9
+
+
+def test_expired_and_forgotten_replies_are_refetched(tmp_path):
+    model = CountingModel()
+    gateway = _gateway(tmp_path, model, ttl_seconds=60)
+
+    async def run():
+        await gateway.complete("q")
+        key = gateway._key("q", {})
+        entry = gateway.cache.get(key)
+        gateway.cache.put(key, {**entry, "created": time.time() - 120})
+        assert await gateway.complete("q") == "reply 2"        # older than the TTL
+        await gateway.forget("q")
+        assert await gateway.complete("q") == "reply 3"
+
+    asyncio.run(run())
+
+
+def test_errors_are_counted_and_not_cached(tmp_path):
+    model = CountingModel(error=RuntimeError("boom"))
+    gateway = _gateway(tmp_path, model)
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await gateway.complete("q")
+        model.error = None
+        return await gateway.complete("q")
+
+    assert asyncio.run(run()) == "reply 2"
+    assert gateway.metrics()["errors"] == 1
+
+
+def test_set_backend_overrides_and_restores_factory(tmp_path):
+    default, override = CountingModel(), CountingModel()
+    gateway = _gateway(tmp_path, default)
+    gateway.set_backend(override)
+    assert gateway.backend is override
+    gateway.set_backend(None)
+    assert gateway.backend is default
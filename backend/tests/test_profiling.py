@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.profiling import ProfileAccumulator, profile_dataframe
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(7)
+    n = 5_000
+    df = pd.DataFrame({
+        "store": rng.choice(["North", "South", "East", "West"], n),
+        "units": rng.integers(0, 50, n),
+        "price": rng.normal(20, 5, n).round(2),
+        "discount": rng.random(n),
+    })
+    df["revenue"] = df["units"] * df["price"]
+    df.loc[rng.choice(n, 200, replace=False), "price"] = np.nan
+    df.loc[rng.choice(n, 50, replace=False), "store"] = None
+    return df
+
+
+def _chunked(df, size, **kwargs):
+    acc = ProfileAccumulator(**kwargs)
+    for start in range(0, len(df), size):
+        acc.add(df.iloc[start:start + size])
+    return acc.result()
+
+
+@pytest.mark.parametrize("chunk_rows", [700, 5_000])
+def test_chunked_profile_matches_in_memory(frame, chunk_rows):
+    expected = profile_dataframe(frame)
+    got = _chunked(frame, chunk_rows)
+
+    assert got.shape == expected.shape
+    assert got.dtypes == expected.dtypes
+    assert got.n_missing == expected.n_missing
+    assert got.numeric_columns == expected.numeric_columns
+    assert got.top_values == expected.top_values
+    for c in ("store", "units"):
+        assert got.n_unique[c] == expected.n_unique[c]
+    for c, stats in expected.numeric_stats.items():
+        assert got.numeric_stats[c] == pytest.approx(stats, rel=1e-9)
+    # Streaming correlations use complete rows (pairwise deletion would need every pair's sums)
+    complete = frame[got.numeric_columns].dropna().corr().abs()
+    pd.testing.assert_frame_equal(got.corr, complete, rtol=1e-9)
+
+
+def test_high_cardinality_estimate_is_close(frame):
+    expected = profile_dataframe(frame)
+    # Value counts capped below the column's cardinality → distinct count from the KMV sketch
+    got = _chunked(frame, 700, max_tracked_values=1_000, sketch_size=1_024)
+    assert got.n_unique["discount"] == pytest.approx(expected.n_unique["discount"], rel=0.1)
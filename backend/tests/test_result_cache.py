@@ -0,0 +1,46 @@
+import os
+import time
+
+import numpy as np
+
+from core.result_cache import ResultCache
+
+
+def _age(cache, digest, seconds):
+    path = cache._path(digest)
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_round_trip_and_versioning(tmp_path):
+    cache = ResultCache(str(tmp_path), 10_000_000, "1")
+    cache.put("abc", {"kpis": [{"value": np.float32(1.5)}], "labels": ["a"]})
+    assert cache.get("abc") == {"kpis": [{"value": 1.5}], "labels": ["a"]}
+    # A new pipeline version never serves results computed by the old one
+    assert ResultCache(str(tmp_path), 10_000_000, "2").get("abc") is None
+    cache.delete("abc")
+    assert cache.get("abc") is None
+    cache.delete("abc")  # deleting a missing entry is a no-op
+
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    payload = {"blob": "x" * 1_000}
+    cache = ResultCache(str(tmp_path), 2_500, "1")
+    cache.put("old", payload)
+    cache.put("used", payload)
+    _age(cache, "old", 300)
+    _age(cache, "used", 200)
+    assert cache.get("used") is not None   # a hit refreshes its recency
+
+    cache.put("new", payload)               # third entry puts the directory over budget
+    assert cache.get("old") is None
+    assert cache.get("used") is not None
+    assert cache.get("new") is not None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(str(tmp_path), 10_000, "1")
+    os.makedirs(tmp_path, exist_ok=True)
+    with open(cache._path("bad"), "wb") as f:
+        f.write(b"{not json")
+    assert cache.get("bad") is None
@@ -0,0 +1,53 @@
+import pandas as pd
+
+import core.session_store as session_store
+from core.session_store import DatasetStore
+
+
+def _frame(rows=10):
+    return pd.DataFrame({"a": range(rows)})
+
+
+def test_lru_eviction_by_item_count():
+    store = DatasetStore(max_items=2, ttl_seconds=3600, max_bytes=10**9)
+    store.put(_frame(), "a")
+    store.put(_frame(), "b")
+    assert store.get("a") is not None      # "a" becomes most recently used
+    store.put(_frame(), "c")
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+
+
+def test_byte_budget_keeps_newest_entry():
+    small, big = _frame(10), _frame(100_000)
+    budget = int(small.memory_usage(deep=True).sum()) * 3
+    store = DatasetStore(max_items=10, ttl_seconds=3600, max_bytes=budget)
+    store.put(small, "small")
+    store.put(big, "big")                  # alone over budget: everything older goes, it stays
+    assert store.get("small") is None
+    assert store.get("big") is big
+    assert store.stats() == {"datasets": 1, "bytes": int(big.memory_usage(deep=True).sum())}
+
+
+def test_idle_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "monotonic", lambda: now[0])
+    store = DatasetStore(max_items=10, ttl_seconds=60, max_bytes=10**9)
+    store.put(_frame(), "a")
+    now[0] += 30
+    assert store.get("a") is not None      # access resets the idle clock
+    now[0] += 59
+    assert store.get("a") is not None
+    now[0] += 61
+    assert store.get("a") is None
+    assert store.stats()["datasets"] == 0
+
+
+def test_replacing_an_id_does_not_double_count_bytes():
+    store = DatasetStore(max_items=10, ttl_seconds=3600, max_bytes=10**9)
+    df = _frame(1_000)
+    store.put(df, "a")
+    store.put(df, "a")
+    assert store.stats() == {"datasets": 1, "bytes": int(df.memory_usage(deep=True).sum())}
+    store.drop("a")
+    assert store.stats() == {"datasets": 0, "bytes": 0}
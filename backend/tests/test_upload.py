@@ -0,0 +1,120 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from core.llm_gateway import llm_gateway
+
+PLAN = {
+    "industry": "Retail",
+    "domain_description": "Daily sales of a small store chain.",
+    "kpis": [
+        {"name": "Total Units", "related_columns": ["units"], "aggregation": "sum"},
+        {"name": "Units by Store", "related_columns": ["store", "units"], "aggregation": "sum"},
+        {"name": "Bogus", "related_columns": ["no_such_column"], "aggregation": "sum"},
+    ],
+    "charts": [
+        {"title": "Units over time", "type": "line", "columns": ["order_date", "units"]},
+        {"title": "Units by store", "type": "bar", "columns": ["store", "units"]},
+    ],
+    "insights": {"Sales": ["North sells the most.", "Units are flat."]},
+}
+
+
+class _Reply:
+    def __init__(self, content):
+        self.content = content
+        self.usage_metadata = {"input_tokens": 1, "output_tokens": 1}
+
+
+class StubChatModel:
+    """Answers the plan call (JSON mode) with PLAN, wrapped the way models often do, and every other call with text."""
+
+    model_name = "stub"
+    temperature = 0.0
+
+    def __init__(self, insight_error=None):
+        self.calls = []
+        self.insight_error = insight_error
+
+    async def ainvoke(self, messages, **params):
+        self.calls.append(params)
+        if params.get("response_format", {}).get("type") == "json_object":
+            return _Reply("```json\n" + json.dumps(PLAN) + ",\n```")
+        if self.insight_error is not None:
+            raise self.insight_error
+        return _Reply("Refined insight.")
+
+
+@pytest.fixture
+def stub():
+    model = StubChatModel()
+    llm_gateway.set_backend(model)
+    yield model
+    llm_gateway.set_backend(None)
+
+
+@pytest.fixture
+def csv_bytes():
+    rng = np.random.default_rng(3)
+    n = 400
+    df = pd.DataFrame({
+        "order_date": pd.date_range("2024-01-01", periods=n, freq="D").strftime("%Y-%m-%d"),
+        "store": rng.choice(["North", "South", "East"], n),
+        "units": rng.integers(1, 20, n),
+    })
+    return df, df.to_csv(index=False).encode()
+
+
+def test_upload_builds_dashboard_with_stubbed_model(stub, csv_bytes):
+    df, body = csv_bytes
+    with TestClient(main.app) as client:
+        res = client.post("/upload", files={"file": ("sales.csv", body, "text/csv")}, data={"max_points": "50"})
+    assert res.status_code == 200
+    plan = res.json()
+
+    kpis = {k["name"]: k["value"] for k in plan["kpis"]}
+    assert kpis["Total Units"] == df["units"].sum()
+    top = max(kpis["Units by Store"], key=lambda row: row["units"])
+    assert top["units"] == df.groupby("store")["units"].sum().max()
+    assert kpis["Bogus"] is None
+
+    charts = {c["title"]: c["data"] for c in plan["charts"]}
+    line = charts["Units over time"]
+    assert len(line["labels"]) <= 50
+    assert line["labels"][0].startswith("2024-01-01")
+    assert sorted(charts["Units by store"]["labels"]) == ["East", "North", "South"]
+
+    assert plan["detailed_insights"] == ["Refined insight.", "Refined insight."]
+    assert plan["dataset_id"]
+    assert any(call.get("response_format") for call in stub.calls)
+
+
+def test_gateway_backend_is_rebuilt_after_lifespan_restart():
+    # No stub pinned: the gateway resolves the shared chat model, whose pools the lifespan closes
+    backends = []
+    for _ in range(2):
+        with TestClient(main.app):
+            backend = llm_gateway.backend
+            assert not backend.http_async_client.is_closed
+            backends.append(backend)
+    assert backends[0] is not backends[1]
+
+
+def test_degraded_result_is_not_cached(csv_bytes):
+    _, body = csv_bytes
+    body = body.replace(b"North", b"Nord")     # a file of its own, not cached by the tests above
+    llm_gateway.set_backend(StubChatModel(insight_error=RuntimeError("upstream outage")))
+    try:
+        with TestClient(main.app) as client:
+            first = client.post("/upload", files={"file": ("sales.csv", body, "text/csv")}).json()
+            # Insights fell back to the raw topics, so that result must not be replayed
+            assert first["detailed_insights"] == PLAN["insights"]["Sales"]
+            llm_gateway.set_backend(StubChatModel())
+            second = client.post("/upload", files={"file": ("sales.csv", body, "text/csv")}).json()
+    finally:
+        llm_gateway.set_backend(None)
+    assert second["detailed_insights"] == ["Refined insight.", "Refined insight."]